@@ -6,7 +6,7 @@ from pydantic import BaseModel, EmailStr
 from typing import Optional
 import uuid
 from datetime import datetime, timedelta
-from db import get_db_connection, return_db_connection
+from db import get_db_connection, return_db_connection, DatabaseBusyError
 from auth import (
     verify_password,
     get_password_hash,
@@ -162,7 +162,7 @@ async def register(user_data: UserRegister):
                 "email": user[2]
             }
         }
-    except HTTPException:
+    except (HTTPException, DatabaseBusyError):
         raise
     except Exception as e:
         if conn:
@@ -234,7 +234,7 @@ async def login(credentials: UserLogin):
                 "email": user[2]
             }
         }
-    except HTTPException:
+    except (HTTPException, DatabaseBusyError):
         raise
     except Exception as e:
         if conn:
@@ -0,0 +1,79 @@
+# config/scheduler_config.py
+#
+# Scheduler lanes: named queues keyed on jobs.feature, each with its own
+# concurrency and priority. Settings live in lanes.json and are re-read
+# whenever the file changes, so admins can retune lanes without a restart.
+
+import json
+import os
+
+LANES_FILE = os.getenv(
+    "SCHEDULER_LANES_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "lanes.json"),
+)
+
+# Used when LANES_FILE is missing
+DEFAULT_LANES = {
+    "default": {
+        "features": [],
+        "concurrency": 2,
+        "priority": 0,
+        "default": True,
+        "requires_gpu": False,
+    },
+}
+
+_lanes_cache = {"mtime": None, "lanes": DEFAULT_LANES}
+
+
+def _validate_lanes(raw: dict) -> dict:
+    lanes = {}
+    for name, settings in raw.items():
+        lanes[name] = {
+            "features": list(settings.get("features", [])),
+            "concurrency": max(0, int(settings.get("concurrency", 1))),
+            "priority": int(settings.get("priority", 0)),
+            "default": bool(settings.get("default", False)),
+            # Paused while every GPU backend is down (see services/gpu_pool.py)
+            "requires_gpu": bool(settings.get("requires_gpu", False)),
+        }
+
+    defaults = [name for name, lane in lanes.items() if lane["default"]]
+    if len(defaults) > 1:
+        raise ValueError(f"Only one lane may be the default, got {defaults}")
+    return lanes
+
+
+def get_lanes() -> dict:
+    """
+    Return {lane_name: {features, concurrency, priority, default, requires_gpu}}.
+    The default lane also takes jobs whose feature no lane lists.
+    An invalid file is reported and the previous settings are kept.
+    """
+    try:
+        mtime = os.path.getmtime(LANES_FILE)
+    except OSError:
+        return _lanes_cache["lanes"]
+
+    if mtime != _lanes_cache["mtime"]:
+        try:
+            with open(LANES_FILE, "r") as f:
+                lanes = _validate_lanes(json.load(f))
+            _lanes_cache["lanes"] = lanes
+            print(f"🔧 Loaded scheduler lanes from {LANES_FILE}: {lanes}")
+        except (ValueError, TypeError, AttributeError) as exc:
+            print(f"🔴 Invalid lanes config {LANES_FILE} → {exc}. Keeping previous lanes")
+        _lanes_cache["mtime"] = mtime
+
+    return _lanes_cache["lanes"]
+
+
+def lane_for_feature(feature: str, lanes: dict) -> str:
+    """Name of the lane that runs jobs of `feature`."""
+    default_lane = None
+    for name, lane in lanes.items():
+        if feature in lane["features"]:
+            return name
+        if lane["default"]:
+            default_lane = name
+    return default_lane
@@ -1,14 +1,13 @@
 # backend/feature1.py
 
-from fastapi import APIRouter, UploadFile, File, Query, HTTPException, Depends
-from datetime import datetime
-import uuid
+from fastapi import APIRouter, UploadFile, File, Query, HTTPException, Depends, Request
 import os
 import psycopg2.extras
 from db import get_db_connection, return_db_connection
-from fastapi.responses import FileResponse
 from services.job_repository import get_job_by_id
-from services.feature1_executor import download_mp4
+from services.job_submission import new_job_id, job_upload_dir, resolve_user_id, enqueue_job
+from services.file_serving import serve_file
+from services.upload_ingest import ingest_upload, MAX_VIDEO_UPLOAD_BYTES, MAX_AUDIO_UPLOAD_BYTES
 from auth_router import get_current_user
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional
@@ -85,38 +84,10 @@ async def create_job(
     feature: str = Query("Avatar Sync Studio"),  # Feature name, defaults to Avatar Sync Studio
     current_user: Optional[dict] = Depends(get_user_or_none)
 ):
-    job_id = str(uuid.uuid4())
-    created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-    job_dir = os.path.join(UPLOAD_DIR, job_id)
-    os.makedirs(job_dir, exist_ok=True)
-
-    video_path = os.path.join(job_dir, f"{job_id}.mp4")
-    audio_path = os.path.join(job_dir, f"{job_id}.wav")
-    output_path = os.path.join(OUTPUT_DIR, f"{job_id}.mp4")
-
-    with open(video_path, "wb") as v:
-        v.write(await video.read())
-
-    with open(audio_path, "wb") as a:
-        a.write(await audio.read())
-
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     # Get user_id from authenticated user (from JWT token) or from query param (for internal calls)
     if user_id:
         # Internal service call - resolve user_id from username/email or use as-is if integer
-        try:
-            user_id_int = int(user_id)
-        except ValueError:
-            # If not an int, treat as username and look up user_id
-            cursor.execute("SELECT user_id FROM users WHERE username = %s OR email = %s", (user_id, user_id))
-            user_row = cursor.fetchone()
-            if not user_row:
-                return_db_connection(conn)
-                raise HTTPException(status_code=404, detail="User not found")
-            user_id_int = user_row[0]
+        user_id_int = resolve_user_id(user_id)
     elif current_user:
         # External authenticated call - use user_id from JWT token
         user_id_int = current_user["user_id"]
@@ -124,42 +95,27 @@ async def create_job(
         validate_and_increment_quota(user_id_int, feature)
     else:
         # No authentication and no user_id provided
-        return_db_connection(conn)
         raise HTTPException(status_code=401, detail="Authentication required or user_id must be provided")
 
-    cursor.execute("""
-        INSERT INTO jobs (
-            job_id,
-            user_id,
-            input_video,
-            input_audio,
-            output_video,
-            status,
-            feature,
-            created_at,
-            started_at,
-            completed_at
-        )
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-    """, (
-        job_id,
-        user_id_int,
-        video_path,
-        audio_path,
-        output_path,
-        "QUEUED",
-        feature,  # Set the feature name
-        created_at,
-        None,
-        None
-    ))
-
-    conn.commit()
-    return_db_connection(conn)
+    job_id = new_job_id()
+    job_dir = job_upload_dir(job_id)
+
+    video_path = os.path.join(job_dir, f"{job_id}.mp4")
+    audio_path = os.path.join(job_dir, f"{job_id}.wav")
+
+    # Uploads are streamed to disk in chunks; identical uploads are stored
+    # once and linked into the job directory
+    video_sha256 = await ingest_upload(video, video_path, MAX_VIDEO_UPLOAD_BYTES)
+    audio_sha256 = await ingest_upload(audio, audio_path, MAX_AUDIO_UPLOAD_BYTES)
+
+    job = enqueue_job(
+        job_id, user_id_int, video_path, audio_path, feature=feature,
+        input_video_sha256=video_sha256, input_audio_sha256=audio_sha256,
+    )
 
     return {
-        "job_id": job_id,
-        "status": "QUEUED"
+        "job_id": job["job_id"],
+        "status": job["status"]
     }
 
 @router.get("/jobs")
@@ -207,20 +163,17 @@ def list_jobs(current_user: dict = Depends(get_current_user)):
 #     model_filename=job["output_video"]
 # )
 
-# feature1.py
-
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
-import os
-
 # router = APIRouter(prefix="/feature1")
 
 OUTPUT_DIR = "storage/outputs"
 
 
 @router.get("/download/{job_id}")
-def download_job_output(job_id: str, current_user: dict = Depends(get_current_user)):
-    """Download job output - only if job belongs to authenticated user"""
+def download_job_output(job_id: str, request: Request, current_user: dict = Depends(get_current_user)):
+    """
+    Download job output - only if job belongs to authenticated user.
+    Supports Range requests (video seeking) and ETag/Last-Modified caching.
+    """
     # Verify job belongs to the user
     job = get_job_by_id(job_id)
     
@@ -236,7 +189,8 @@ def download_job_output(job_id: str, current_user: dict = Depends(get_current_us
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="File not found")
 
-    return FileResponse(
+    return serve_file(
+        request,
         path=file_path,
         media_type="video/mp4",
         filename=f"{job_id}.mp4"
@@ -1,13 +1,11 @@
 # backend/feature2.py
 
 import os
-import uuid
-import threading
-import requests
 from fastapi import APIRouter, UploadFile, Form, File, HTTPException, Depends, Query
 
 from config.tts_config import get_voice
-from services.tts_client import generate_audio
+from services.upload_ingest import ingest_upload, MAX_VIDEO_UPLOAD_BYTES
+from services.job_submission import new_job_id, job_upload_dir, resolve_user_id, enqueue_job
 from auth_router import get_current_user
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional
@@ -29,8 +27,6 @@ async def get_user_or_none(
 
 router = APIRouter(prefix="/feature2", tags=["Feature2"])
 
-FEATURE1_ENDPOINT = "http://127.0.0.1:8000/feature1/create-job"
-
 
 import subprocess
 
@@ -55,28 +51,6 @@ def normalize_audio(input_wav: str) -> str:
 
 
 
-def enqueue_feature1_job(user_id_int, video_path, audio_path, feature_name="Text-to-Avatar Studio"):
-    """Enqueue feature1 job - user_id_int is integer from database"""
-    try:
-        with open(video_path, "rb") as v, open(audio_path, "rb") as a:
-            # Pass user_id and feature name as query params for internal service call
-            requests.post(
-                FEATURE1_ENDPOINT,
-                params={
-                    "user_id": str(user_id_int),
-                    "feature": feature_name
-                },
-                files={
-                    "video": (os.path.basename(video_path), v, "video/mp4"),
-                    "audio": (os.path.basename(audio_path), a, "audio/wav"),
-                },
-                timeout=5
-            )
-    except Exception as e:
-        # Log only — never crash Feature-2
-        print(f"[Feature2] Failed to enqueue Feature-1 job: {e}")
-
-
 @router.post("/text-to-avatar")
 async def text_to_avatar(
     text: str = Form(...),
@@ -86,38 +60,15 @@ async def text_to_avatar(
     feature_name: str = Query("Text-to-Avatar Studio"),  # Feature name for tracking
     current_user: Optional[dict] = Depends(get_user_or_none)
 ):
-    job_id = str(uuid.uuid4())
-    upload_dir = f"storage/uploads/{job_id}"
-    os.makedirs(upload_dir, exist_ok=True)
-
-    video_path = os.path.join(upload_dir, f"{job_id}.mp4")
-    with open(video_path, "wb") as f:
-        f.write(await video.read())
-
     try:
         voice = get_voice(gender)
-        audio_path = os.path.join(upload_dir, f"{job_id}.wav")
-        # audio_path = normalize_audio(audio_path)
-        generate_audio(text=text, voice=voice, output_path=audio_path)
-    except Exception as e:
-        raise HTTPException(500, f"TTS failed: {e}")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Unsupported gender")
 
     # Get user_id from authenticated user or from query param (for internal calls)
     if user_id:
         # Internal service call - resolve user_id from username/email or use as-is if integer
-        try:
-            user_id_int = int(user_id)
-        except ValueError:
-            # If not an int, treat as username and look up user_id
-            from db import get_db_connection, return_db_connection
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT user_id FROM users WHERE username = %s OR email = %s", (user_id, user_id))
-            user_row = cursor.fetchone()
-            return_db_connection(conn)
-            if not user_row:
-                raise HTTPException(status_code=404, detail="User not found")
-            user_id_int = user_row[0]
+        user_id_int = resolve_user_id(user_id)
     elif current_user:
         # External authenticated call
         user_id_int = current_user["user_id"]
@@ -126,13 +77,27 @@ async def text_to_avatar(
     else:
         # No authentication and no user_id provided
         raise HTTPException(status_code=401, detail="Authentication required or user_id must be provided")
-    
-    # 🔥 FIRE & FORGET - Pass user_id_int and feature name for internal service call
-    threading.Thread(
-        target=enqueue_feature1_job,
-        args=(user_id_int, video_path, audio_path, feature_name),
-        daemon=True
-    ).start()
+
+    job_id = new_job_id()
+    upload_dir = job_upload_dir(job_id)
+
+    video_path = os.path.join(upload_dir, f"{job_id}.mp4")
+    # Streamed to disk; identical videos are stored only once
+    video_sha256 = await ingest_upload(video, video_path, MAX_VIDEO_UPLOAD_BYTES)
+
+    # TTS is the first stage of the job (run by the scheduler), so the
+    # request returns as soon as the upload is stored
+    audio_path = os.path.join(upload_dir, f"{job_id}.wav")
+    enqueue_job(
+        job_id,
+        user_id_int,
+        video_path,
+        audio_path,
+        feature=feature_name,
+        input_text=text,
+        voice=voice,
+        input_video_sha256=video_sha256,
+    )
 
     # ✅ Immediate success response
     return {
@@ -1,55 +1,20 @@
 # backend/feature3.py
 
-import threading
-import requests
+import os
 from typing import List
 from fastapi import APIRouter, UploadFile, Form, File, HTTPException, Depends
 
 from services.template_renderer import render_template
 from auth_router import get_current_user
 from quota_utils import validate_and_increment_quota
+from config.tts_config import get_voice
+from services.batch_jobs import submit_batch
+from services.job_submission import new_job_id, job_upload_dir
+from services.job_repository import get_batch
+from services.upload_ingest import ingest_upload, MAX_VIDEO_UPLOAD_BYTES
 
 router = APIRouter(prefix="/feature3", tags=["Feature3"])
 
-FEATURE2_ENDPOINT = "http://127.0.0.1:8000/feature2/text-to-avatar"
-
-
-def fire_feature2(video_bytes: bytes, video_name: str, payload: dict, user_id_int: int, feature_name: str):
-    """
-    Fire-and-forget call to Feature-2
-    Note: Feature-2 now requires auth, but for internal calls we pass user_id
-    """
-    try:
-        print("\n[Feature3] → Calling Feature-2")
-        print("[Feature3] Payload:", payload)
-        print("[Feature3] Video:", video_name)
-        print("[Feature3] User ID:", user_id_int)
-        print("[Feature3] Feature Name:", feature_name)
-
-        files = {
-            "video": (video_name, video_bytes, "video/mp4")
-        }
-
-        # Pass user_id and feature_name for internal call
-        response = requests.post(
-            FEATURE2_ENDPOINT,
-            params={
-                "user_id": str(user_id_int),
-                "feature_name": feature_name  # Pass feature name to feature2
-            },
-            data=payload,
-            files=files,
-            timeout=5  # short timeout, async fire
-        )
-
-        print("[Feature3] Feature-2 status:", response.status_code)
-        print("[Feature3] Feature-2 response:", response.text)
-
-    except Exception as e:
-        # Never crash Feature-3
-        print("[Feature3] Feature-2 async error:", e)
-
-
 @router.post("/personalized-wishes")
 async def personalized_wishes(
     script: str = Form(...),
@@ -72,29 +37,67 @@ async def personalized_wishes(
     texts = render_template(script, names)
     print(f"[Feature3] Total jobs to queue: {len(texts)}")
 
-    # 2️⃣ Read video ONCE
-    video_bytes = await video.read()
+    # 2️⃣ Store video ONCE, in the batch (parent job) directory
+    batch_id = new_job_id()
+    video_path = os.path.join(job_upload_dir(batch_id), f"{batch_id}.mp4")
+    video_sha256 = await ingest_upload(video, video_path, MAX_VIDEO_UPLOAD_BYTES)
 
     # 3️⃣ FORCE gender = female (IMPORTANT FIX)
     gender = "female"
-    
-    # 4️⃣ Fire Feature-2 asynchronously for each text
-    # Pass user_id and feature name for internal service call
-    for text in texts:
-        payload = {
-            "gender": gender,   # ✅ FIXED HERE
-            "text": text
-        }
 
-        threading.Thread(
-            target=fire_feature2,
-            args=(video_bytes, video.filename, payload, user_id_int, feature_name),
-            daemon=True
-        ).start()
+    # 4️⃣ One batch: parent + one child job per text, inserted together.
+    # Children are queued at once; the scheduler's TTS stage generates each
+    # child's audio when a worker claims it (services/tts_stage.py)
+    batch = submit_batch(
+        user_id_int,
+        feature_name,
+        video_path,
+        texts,
+        get_voice(gender),
+        parent_job_id=batch_id,
+        video_sha256=video_sha256,
+    )
 
     # 5️⃣ Immediate response
     return {
         "status": "QUEUED",
-        "jobs_created": len(texts),
+        "batch_id": batch["job_id"],
+        "jobs_created": batch["jobs_created"],
+        "job_ids": batch["job_ids"],
         "message": "All personalized jobs queued successfully"
     }
+
+
+@router.get("/batches/{batch_id}")
+def batch_status(batch_id: str, current_user: dict = Depends(get_current_user)):
+    """
+    Progress of a Personalized Wishes batch and the state of every job in
+    it, from a single query. Replaces polling /feature1/jobs per name.
+    """
+    result = get_batch(batch_id)
+
+    if not result:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    batch = result["batch"]
+    if batch.get("user_id") != current_user["user_id"]:
+        raise HTTPException(status_code=403, detail="Access denied: This batch does not belong to you")
+
+    return {
+        "batch_id": batch["job_id"],
+        "status": batch["status"],
+        "total": batch["children_total"],
+        "completed": batch["children_completed"],
+        "failed": batch["children_failed"],
+        "created_at": batch["created_at"],
+        "completed_at": batch["completed_at"],
+        "jobs": [
+            {
+                "job_id": job["job_id"],
+                "status": job["status"],
+                "text": job["input_text"],
+                "completed_at": job["completed_at"],
+            }
+            for job in result["jobs"]
+        ],
+    }
@@ -1,6 +1,7 @@
 # main.py
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from feature1 import router as feature1_router
 from feature2 import router as feature2_router 
@@ -8,10 +9,15 @@ from feature3 import router as feature3_router
 from feature4 import router as feature4_router
 from auth_router import router as auth_router
 
-from db import init_db
+from db import init_db, DatabaseBusyError
+from services.upload_ingest import UploadLimitMiddleware
 
 app = FastAPI(title="IntelliAvatar API")
 
+# Reject oversized uploads from Content-Length, before the body is read
+# (added first so the CORS middleware still wraps its responses)
+app.add_middleware(UploadLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # for development
@@ -19,6 +25,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(DatabaseBusyError)
+async def database_busy_handler(request: Request, exc: DatabaseBusyError):
+    # All DB connections are in use; the client should retry shortly
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server busy, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
 # Initialize database and tables
 init_db()
 
@@ -1,48 +1,225 @@
 # scheduler.py
 
+import os
 import time
+import select
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from db import get_listen_connection
+from config.scheduler_config import get_lanes, LANES_FILE
 from services.job_repository import (
-    fetch_oldest_pending_job,
-    has_in_progress_job
+    claim_next_job,
+    requeue_expired_jobs,
+    DEFAULT_FEATURE,
+    JOB_QUEUED_CHANNEL,
+    NODE_ID,
 )
 from services.job_executor import execute_job
+from services.gpu_pool import get_gpu_pool
+from services.libreoffice_pool import get_office_pool
+from services.storage_cleanup import sweep_uploads, STORAGE_SWEEP_INTERVAL
 
-CHECK_INTERVAL = 5  # seconds
+# New jobs wake the scheduler via LISTEN/NOTIFY; this slow poll is only a
+# safety net for missed notifications (e.g. while the listener reconnects)
+FALLBACK_POLL_INTERVAL = int(os.getenv("SCHEDULER_FALLBACK_POLL", "60"))  # seconds
+LISTEN_RECONNECT_DELAY = 5  # seconds
+# How often expired job leases are looked for
+REAPER_INTERVAL = int(os.getenv("SCHEDULER_REAPER_INTERVAL", "15"))  # seconds
+# How often paused GPU lanes check whether a backend came back
+PAUSED_RECHECK_INTERVAL = 5  # seconds
 
+# Worker threads shared by all lanes. This is only a ceiling: the number of
+# jobs actually in flight is the sum of the lane "concurrency" values in
+# config/lanes.json (3 with the shipped file), so raise those to run more.
+# CPU-heavy steps are bounded separately by services/cpu_pool.py, and
+# db.py sizes its connection pool from this value.
+MAX_CONCURRENT_JOBS = int(os.getenv("SCHEDULER_SLOTS", "32"))
 
-def run_scheduler():
-    print("🟢 Scheduler started (STRICT SINGLE-JOB MODE)")
 
-    in_progress_logged = False
+class WorkerPool:
+    """
+    Runs `execute_job` calls in parallel, split into lanes keyed on
+    jobs.feature (see config/scheduler_config.py). Each lane has its own
+    concurrency, so short lipsync jobs never wait behind long IntelliTutor
+    renders; when worker threads are scarce, higher-priority lanes claim
+    first. Jobs are claimed atomically in the DB, so slots never share a job.
+    """
 
-    while True:
-        # If a job is already running, wait silently
-        if has_in_progress_job():
-            if not in_progress_logged:
-                print("⏳ Job execution in progress. Waiting for completion...")
-                in_progress_logged = True
+    def __init__(self, slots: int):
+        self.slots = slots
+        self.executor = ThreadPoolExecutor(max_workers=slots, thread_name_prefix="job-slot")
+        self.running = {}  # job_id -> lane name
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.paused_lanes = set()
+
+    def free_slots(self) -> int:
+        with self.lock:
+            return self.slots - len(self.running)
 
-            time.sleep(CHECK_INTERVAL)
-            continue
+    def lane_running(self, lane_name: str) -> int:
+        with self.lock:
+            return sum(1 for lane in self.running.values() if lane == lane_name)
 
-        # If we reach here, no job is IN_PROGRESS anymore
-        if in_progress_logged:
-            print("✅ Job execution completed.")
-            print("🔁 Checking for next job...\n")
-            in_progress_logged = False
+    def submit(self, job: dict, lane_name: str):
+        job_id = job["job_id"]
+        with self.lock:
+            self.running[job_id] = lane_name
 
-        # Fetch next QUEUED job
-        job = fetch_oldest_pending_job()
+        future = self.executor.submit(execute_job, job)
+        future.add_done_callback(lambda _f: self._on_done(job_id))
 
-        if not job:
-            time.sleep(CHECK_INTERVAL)
-            continue
+    def _on_done(self, job_id: str):
+        with self.lock:
+            lane_name = self.running.pop(job_id, None)
+        print(f"✅ Slot freed by job {job_id} (lane {lane_name})")
+        # Let the dispatch loop claim the next job right away
+        self.wakeup.set()
 
-        job_id = job["job_id"]
-        print(f"🚀 Starting job {job_id}")
+    def _claim_for_lane(self, lane: dict, lanes: dict):
+        if lane["default"]:
+            # The default lane also takes features no other lane lists
+            other_features = [
+                feature
+                for other in lanes.values() if other is not lane
+                for feature in other["features"]
+            ]
+            return claim_next_job(exclude_features=other_features)
+        return claim_next_job(include_features=lane["features"])
+
+    def fill(self) -> int:
+        """Claim jobs until every lane is full or its queue is empty."""
+        lanes = get_lanes()
+        started = 0
+        gpu_available = get_gpu_pool().has_available_backend()
+
+        for lane_name, lane in sorted(lanes.items(), key=lambda item: -item[1]["priority"]):
+            # Don't claim jobs that would only burn their timeout on a dead GPU
+            if lane["requires_gpu"] and not gpu_available:
+                if lane_name not in self.paused_lanes:
+                    print(f"⏸️ Lane {lane_name} paused: no healthy GPU backend")
+                    self.paused_lanes.add(lane_name)
+                continue
+            if lane_name in self.paused_lanes:
+                print(f"▶️ Lane {lane_name} resumed")
+                self.paused_lanes.discard(lane_name)
+
+            while self.free_slots() > 0 and self.lane_running(lane_name) < lane["concurrency"]:
+                job = self._claim_for_lane(lane, lanes)
+                if not job:
+                    break
+
+                print(f"🚀 Starting job {job['job_id']} ({job.get('feature') or DEFAULT_FEATURE}, lane {lane_name})")
+                self.submit(job, lane_name)
+                started += 1
+        return started
+
+
+class JobQueueListener(threading.Thread):
+    """
+    LISTENs on the job_queued channel and sets `wakeup` for every
+    notification, so queued jobs start within milliseconds.
+    """
+
+    def __init__(self, wakeup: threading.Event):
+        super().__init__(name="job-listener", daemon=True)
+        self.wakeup = wakeup
+
+    def run(self):
+        while True:
+            conn = None
+            try:
+                conn = get_listen_connection()
+                conn.cursor().execute(f"LISTEN {JOB_QUEUED_CHANNEL}")
+                print(f"👂 Listening for new jobs on '{JOB_QUEUED_CHANNEL}'")
+                # Jobs queued while we were (re)connecting were not notified
+                self.wakeup.set()
+
+                while True:
+                    # Block on the socket; no DB traffic while idle
+                    if select.select([conn], [], [], FALLBACK_POLL_INTERVAL) == ([], [], []):
+                        continue
+                    conn.poll()
+                    if conn.notifies:
+                        conn.notifies.clear()
+                        self.wakeup.set()
+            except Exception as exc:
+                print(f"🔴 Job listener error → {exc}. Reconnecting in {LISTEN_RECONNECT_DELAY}s")
+                time.sleep(LISTEN_RECONNECT_DELAY)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+
+class LeaseReaper(threading.Thread):
+    """
+    Periodically requeues (or fails, once out of attempts) IN_PROGRESS jobs
+    whose lease expired because their worker died.
+    """
+
+    def __init__(self, wakeup: threading.Event):
+        super().__init__(name="lease-reaper", daemon=True)
+        self.wakeup = wakeup
+
+    def run(self):
+        while True:
+            try:
+                recovered = requeue_expired_jobs()
+                for job_id, status in recovered:
+                    print(f"♻️ Job {job_id} lease expired → {status}")
+                if recovered:
+                    self.wakeup.set()
+            except Exception as exc:
+                print(f"🔴 Lease reaper error → {exc}")
+            time.sleep(REAPER_INTERVAL)
+
+
+class StorageSweeper(threading.Thread):
+    """
+    Periodically removes upload directories of finished jobs and the blobs
+    no job links to anymore (see services/storage_cleanup.py).
+    """
+
+    def __init__(self):
+        super().__init__(name="storage-sweeper", daemon=True)
+
+    def run(self):
+        while True:
+            try:
+                dirs, blobs = sweep_uploads()
+                if dirs or blobs:
+                    print(f"🧹 Removed {dirs} job upload dirs and {blobs} unreferenced blobs")
+            except Exception as exc:
+                print(f"🔴 Storage sweep error → {exc}")
+            time.sleep(STORAGE_SWEEP_INTERVAL)
+
+
+def run_scheduler():
+    print(f"🟢 Scheduler node {NODE_ID} started ({MAX_CONCURRENT_JOBS} slots, lanes from {LANES_FILE})")
+
+    pool = WorkerPool(MAX_CONCURRENT_JOBS)
+    JobQueueListener(pool.wakeup).start()
+    LeaseReaper(pool.wakeup).start()
+    StorageSweeper().start()
+    # Start the LibreOffice instances now, not on the first IntelliTutor job
+    get_office_pool()
+
+    while True:
+        # Clear before dispatching so a slot freed mid-dispatch still wakes us
+        pool.wakeup.clear()
+        try:
+            pool.fill()
+        except Exception as exc:
+            # DB hiccups must not kill the scheduler
+            print(f"🔴 Scheduler dispatch error → {exc}")
 
-        execute_job(job)
-        # After this, job will be IN_PROGRESS and loop will wait silently
+        # Sleep until a job is queued, a slot frees up, or the fallback poll
+        # (sooner while lanes are paused, to resume once the GPU is back)
+        pool.wakeup.wait(PAUSED_RECHECK_INTERVAL if pool.paused_lanes else FALLBACK_POLL_INTERVAL)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,108 @@
+# services/batch_jobs.py
+#
+# Batch jobs for fan-out features (Personalized Wishes).
+#
+# A batch is one parent row (status BATCH) plus one child job per item,
+# inserted together in a single transaction. All children share the
+# parent's input video, so submitting 1000 names costs one upload, one
+# INSERT statement and no per-name files. Children are QUEUED with their
+# text and voice; the scheduler runs TTS as the first stage of each job
+# (services/tts_stage.py).
+#
+# Each child also gets a job_edges row pointing at the parent. The
+# parent's children_completed / children_failed counters move as children
+# finish (see job_repository._record_finished_jobs) and it closes itself
+# when the last one is done.
+
+import os
+from datetime import datetime
+
+from psycopg2.extras import execute_values
+
+from db import get_db_connection, return_db_connection
+from services.job_repository import (
+    STATUS_BATCH,
+    STATUS_QUEUED,
+    notify_job_queued,
+)
+from services.job_submission import new_job_id, job_upload_dir, OUTPUT_DIR
+
+
+def submit_batch(user_id_int: int, feature: str, video_path: str, texts, voice: str,
+                 parent_job_id: str = None, video_sha256: str = None) -> dict:
+    """
+    Insert a parent job and one child per text in one transaction and
+    wake the scheduler. `video_path` must already be stored
+    (normally in the parent's upload dir); `video_sha256` is its digest
+    from ingest_upload. Returns the batch summary.
+    """
+    if parent_job_id is None:
+        parent_job_id = new_job_id()
+    audio_dir = job_upload_dir(parent_job_id)
+    created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    children = []
+    for text in texts:
+        job_id = new_job_id()
+        children.append((
+            job_id,
+            user_id_int,
+            parent_job_id,
+            video_path,
+            video_sha256,
+            os.path.join(audio_dir, f"{job_id}.wav"),
+            os.path.join(OUTPUT_DIR, f"{job_id}.mp4"),
+            STATUS_QUEUED,
+            feature,
+            text,
+            voice,
+            created_at,
+        ))
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("""
+            INSERT INTO jobs (
+                job_id, user_id, input_video, input_audio, output_video,
+                status, feature, created_at, children_total
+            )
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, (
+            parent_job_id, user_id_int, video_path, "", "",
+            STATUS_BATCH, feature, created_at, len(children)
+        ))
+
+        execute_values(cursor, """
+            INSERT INTO jobs (
+                job_id, user_id, parent_job_id, input_video, input_video_sha256,
+                input_audio, output_video, status, feature, input_text, voice, created_at
+            )
+            VALUES %s
+        """, children, page_size=500)
+
+        execute_values(cursor, """
+            INSERT INTO job_edges (upstream_job_id, downstream_job_id)
+            VALUES %s
+        """, [(child[0], parent_job_id) for child in children], page_size=500)
+
+        # One wakeup is enough: the scheduler fills every free slot
+        notify_job_queued(cursor, parent_job_id)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        raise
+    finally:
+        return_db_connection(conn)
+
+    print(f"📦 Batch {parent_job_id}: {len(children)} jobs queued")
+
+    return {
+        "job_id": parent_job_id,
+        "status": STATUS_BATCH,
+        "feature": feature,
+        "jobs_created": len(children),
+        "job_ids": [child[0] for child in children],
+    }
+
@@ -0,0 +1,117 @@
+# services/blob_store.py
+#
+# Content-addressed store for uploaded media. Each distinct file is written
+# once to storage/blobs/<aa>/<sha256>; job directories under storage/uploads
+# get hard links to the shared blob, so executors keep using their usual
+# per-job paths. The blob's link count is its reference count: a blob with
+# no job links left (st_nlink == 1) is removed by gc(), which the scheduler
+# runs after removing finished jobs' directories (services/storage_cleanup.py).
+
+import os
+import time
+import shutil
+import hashlib
+import threading
+
+BLOB_DIR = "storage/blobs"
+# Unreferenced blobs younger than this are kept (an upload may be linking them)
+BLOB_GC_GRACE_SECONDS = 3600
+
+
+def blob_path(digest: str) -> str:
+    return os.path.join(BLOB_DIR, digest[:2], digest)
+
+
+def _tmp_path() -> str:
+    os.makedirs(BLOB_DIR, exist_ok=True)
+    return os.path.join(BLOB_DIR, f".tmp-{os.getpid()}-{threading.get_ident()}-{time.time_ns()}")
+
+
+def _commit_tmp(tmp: str, digest: str) -> str:
+    """Move a fully written temp file to its blob path (or drop it if the blob exists)."""
+    path = blob_path(digest)
+    if os.path.exists(path):
+        os.remove(tmp)
+        # Refresh the mtime so gc() leaves it alone until the new link exists
+        os.utime(path)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp, path)
+    return path
+
+
+class BlobWriter:
+    """
+    Write a blob incrementally, hashing and counting bytes as they arrive.
+    The data goes to a temp file inside BLOB_DIR; commit() renames it to
+    its content address, so it is written to disk exactly once.
+    """
+
+    def __init__(self):
+        self.tmp = _tmp_path()
+        self.file = open(self.tmp, "wb")
+        self.hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, chunk: bytes):
+        self.file.write(chunk)
+        self.hash.update(chunk)
+        self.size += len(chunk)
+
+    def commit(self) -> str:
+        """Finish the blob; returns its sha256."""
+        self.file.close()
+        digest = self.hash.hexdigest()
+        _commit_tmp(self.tmp, digest)
+        return digest
+
+    def discard(self):
+        self.file.close()
+        if os.path.exists(self.tmp):
+            os.remove(self.tmp)
+
+
+def link_or_copy(src: str, dest: str) -> str:
+    """
+    Hard-link src to dest, atomically replacing dest; copy if linking is
+    not possible. Shared by the blob store and the result / TTS caches.
+    """
+    os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+    tmp = f"{dest}.tmp-{os.getpid()}-{threading.get_ident()}-{time.time_ns()}"
+    try:
+        try:
+            os.link(src, tmp)
+        except OSError:
+            # Different filesystem or no hard-link support
+            shutil.copyfile(src, tmp)
+        os.replace(tmp, dest)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return dest
+
+
+def link_blob(digest: str, dest_path: str) -> str:
+    """Make `dest_path` point at the blob (hard link; copy if linking fails)."""
+    return link_or_copy(blob_path(digest), dest_path)
+
+
+def gc() -> int:
+    """Remove blobs that no job file links to anymore; returns how many were removed."""
+    if not os.path.isdir(BLOB_DIR):
+        return 0
+
+    removed = 0
+    now = time.time()
+    for root, _dirs, files in os.walk(BLOB_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if st.st_nlink == 1 and now - st.st_mtime > BLOB_GC_GRACE_SECONDS:
+                os.remove(path)
+                removed += 1
+    return removed
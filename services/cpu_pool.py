@@ -0,0 +1,27 @@
+# services/cpu_pool.py
+#
+# Bounded stage for CPU-heavy job steps (ffmpeg, LibreOffice, slide
+# rendering, audio merging). Scheduler slots mostly wait on remote GPU/TTS
+# services, so many of them can be in flight at once; only the CPU-bound
+# parts are limited here so they never oversubscribe the machine.
+
+import os
+import threading
+from contextlib import contextmanager
+
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", str(os.cpu_count() or 2)))
+
+_cpu_slots = threading.BoundedSemaphore(CPU_WORKERS)
+
+
+@contextmanager
+def cpu_slot():
+    """Hold one of CPU_WORKERS slots for the duration of the block."""
+    with _cpu_slots:
+        yield
+
+
+def run_cpu_bound(fn, *args, **kwargs):
+    """Run fn(*args, **kwargs) once a CPU slot is free."""
+    with cpu_slot():
+        return fn(*args, **kwargs)
@@ -0,0 +1,172 @@
+# services/downloader.py
+#
+# Download engine for model outputs. Files are written straight into their
+# final directory (as "<dest>.part", renamed into place when complete),
+# with 1 MB buffers. When the server supports HTTP Range requests:
+# - a dropped connection resumes from the last byte received instead of
+#   restarting from zero;
+# - large files can optionally be fetched as DOWNLOAD_SEGMENTS parallel
+#   ranged segments.
+
+import os
+import time
+import threading
+
+import requests
+
+from services.http_client import get_session
+from services.resilience import check_response, backoff_delay
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MB
+# Parallel ranged segments per download (1 = single stream)
+DOWNLOAD_SEGMENTS = int(os.getenv("DOWNLOAD_SEGMENTS", "1"))
+# Files smaller than this per segment are not split
+DOWNLOAD_MIN_SEGMENT_BYTES = 8 * 1024 * 1024
+# Resume attempts after a dropped connection, per stream
+DOWNLOAD_RESUME_ATTEMPTS = int(os.getenv("DOWNLOAD_RESUME_ATTEMPTS", "5"))
+
+# Errors after which a partial download can be resumed
+RESUMABLE_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.Timeout,
+)
+
+
+class DownloadError(RuntimeError):
+    """The server refused the download or returned incomplete data."""
+
+
+def _open(url, params, timeout, start=None, end=None):
+    headers = {}
+    if start is not None:
+        headers["Range"] = f"bytes={start}-" if end is None else f"bytes={start}-{end}"
+
+    response = get_session().get(url, params=params, headers=headers, stream=True, timeout=timeout)
+    check_response(response)
+
+    if start is None:
+        expected = (200,)
+    elif start == 0:
+        # A full 200 body is fine when reading from the first byte
+        expected = (200, 206)
+    else:
+        expected = (206,)
+
+    if response.status_code not in expected:
+        text = response.text[:500]
+        response.close()
+        raise DownloadError(f"Download failed ({response.status_code}): {text}")
+    return response
+
+
+def _write_stream(response, f, offset, end=None) -> int:
+    """Write the response body at `offset`; returns the offset after the last byte written."""
+    f.seek(offset)
+    with response:
+        for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+            if not chunk:
+                continue
+            if end is not None:
+                chunk = chunk[:end + 1 - offset]
+            f.write(chunk)
+            offset += len(chunk)
+            if end is not None and offset > end:
+                break
+    return offset
+
+
+def _fetch_range(url, params, timeout, part_path, start, end, first_response=None):
+    """
+    Fetch bytes start..end (inclusive; end=None means to EOF) into part_path,
+    resuming after dropped connections. Returns the offset reached.
+    """
+    offset = start
+    attempts = 0
+    response = first_response
+
+    with open(part_path, "r+b") as f:
+        while True:
+            try:
+                if response is None:
+                    response = _open(url, params, timeout, start=offset, end=end)
+                offset = _write_stream(response, f, offset, end)
+                return offset
+            except RESUMABLE_ERRORS as exc:
+                response = None
+                attempts += 1
+                if attempts > DOWNLOAD_RESUME_ATTEMPTS:
+                    raise
+                print(f"⚠️ Download interrupted at byte {offset} ({exc}); resuming")
+                time.sleep(backoff_delay(attempts - 1, base=0.5, cap=10))
+
+
+def download_file(url, dest_path, params=None, timeout=300, segments=None, response=None) -> str:
+    """
+    Download `url` to `dest_path` and return dest_path.
+    `response` may be an already opened streaming GET of the same URL.
+    """
+    segments = DOWNLOAD_SEGMENTS if segments is None else segments
+    os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+    part_path = f"{dest_path}.part"
+
+    if response is None:
+        response = _open(url, params, timeout)
+    elif response.status_code != 200:
+        raise DownloadError(f"Download failed ({response.status_code}): {response.text[:500]}")
+
+    length = response.headers.get("content-length")
+    length = int(length) if length and length.isdigit() else None
+    ranges = response.headers.get("accept-ranges", "").lower() == "bytes"
+
+    # Create (and, if the size is known, preallocate) the part file
+    with open(part_path, "wb") as f:
+        if length:
+            f.truncate(length)
+
+    try:
+        if ranges and length and segments > 1 and length >= 2 * DOWNLOAD_MIN_SEGMENT_BYTES:
+            response.close()
+            _download_segments(url, params, timeout, part_path, length, segments)
+        elif ranges:
+            offset = _fetch_range(url, params, timeout, part_path, 0, None, first_response=response)
+            if length is not None and offset != length:
+                raise DownloadError(f"Incomplete download: {offset} of {length} bytes")
+        else:
+            # No Range support: a dropped connection means starting over
+            with open(part_path, "r+b") as f:
+                offset = _write_stream(response, f, 0)
+                f.truncate(offset)
+            if length is not None and offset != length:
+                raise DownloadError(f"Incomplete download: {offset} of {length} bytes")
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+
+    os.replace(part_path, dest_path)
+    return dest_path
+
+
+def _download_segments(url, params, timeout, part_path, length, segments):
+    segments = min(segments, max(1, length // DOWNLOAD_MIN_SEGMENT_BYTES))
+    size = -(-length // segments)  # ceil
+    bounds = [(i * size, min(length, (i + 1) * size) - 1) for i in range(segments)]
+    errors = []
+
+    def fetch(start, end):
+        try:
+            reached = _fetch_range(url, params, timeout, part_path, start, end)
+            if reached != end + 1:
+                raise DownloadError(f"Incomplete segment {start}-{end}: stopped at {reached}")
+        except BaseException as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=fetch, args=b, daemon=True) for b in bounds]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    if errors:
+        raise errors[0]
@@ -1,8 +1,14 @@
-import requests
 import os
-import shutil
 import logging
 
+from services.http_client import get_session
+from services.gpu_pool import get_gpu_pool
+from services.resilience import get_policy, check_response, is_retryable_submission
+from services import result_cache
+from services.blob_store import link_or_copy
+from services.multipart_stream import MultipartFileStream, progress_logger
+from services.downloader import download_file
+
 # ---------------- LOGGING SETUP ----------------
 logging.basicConfig(
     level=logging.INFO,
@@ -12,13 +18,7 @@ logger = logging.getLogger(__name__)
 # ------------------------------------------------
 
 
-# 🔹 GPU MODEL SERVER (INFERENCE)
-MODEL_GPU_URL = "http://154.201.127.0:7001"
-INFER_ENDPOINT = f"{MODEL_GPU_URL}/generate"
-
-# 🔹 FILE SERVER (DOWNLOAD)
-FILE_SERVER_URL = "http://154.201.127.0:7000"
-DOWNLOAD_ENDPOINT = f"{FILE_SERVER_URL}/get_file"
+# 🔹 GPU MODEL + FILE SERVERS: see services/gpu_pool.py (GPU_BACKENDS)
 
 # 🔹 OUTPUT STORAGE
 OUTPUT_DIR = "storage/outputs"
@@ -29,46 +29,54 @@ def run_feature1_job(job):
     job_id = job["job_id"]
 
     logger.info(f"[JOB {job_id}] Starting Feature-1 execution")
-    logger.info(f"[JOB {job_id}] Sending video & audio to model")
-
-    # 1️⃣ Call model
-    response = requests.post(
-        INFER_ENDPOINT,
-        files={
-            "media": open(job["input_video"], "rb"),
-            "audio": open(job["input_audio"], "rb")
-        },
-        timeout=1800
-    )
-
-    logger.info(f"[JOB {job_id}] Model HTTP status: {response.status_code}")
-    logger.info(f"[JOB {job_id}] Model raw response: {response.text}")
-
-    if response.status_code != 200:
-        raise Exception(f"Model failed: {response.text}")
-
-    data = response.json()
-
-    if data.get("status") != "success":
-        raise Exception(f"Model returned non-success: {data}")
-
-    # 2️⃣ Extract remote filename (uuid_date-r.mp4)
-    remote_filename = data["video"].split("/")[-1]
-    logger.info(f"[JOB {job_id}] Model output filename: {remote_filename}")
 
-    # 3️⃣ Download immediately
-    logger.info(f"[JOB {job_id}] Downloading output from file server")
-    temp_path = download_mp4(remote_filename)
-
-    # 4️⃣ Move + rename to outputs/<uuid>.mp4
     final_path = os.path.join(OUTPUT_DIR, f"{job_id}.mp4")
 
-    logger.info(f"[JOB {job_id}] Moving file to: {final_path}")
-    shutil.move(temp_path, final_path)
+    # 0️⃣ Same media rendered before with this model? Reuse the output.
+    cache_key = None
+    try:
+        cache_key = result_cache.lipsync_cache_key(
+            job["input_video"],
+            job["input_audio"],
+            video_sha256=job.get("input_video_sha256"),
+            audio_sha256=job.get("input_audio_sha256"),
+        )
+        cached = result_cache.lookup(cache_key)
+        if cached:
+            link_or_copy(cached, final_path)
+            logger.info(f"[JOB {job_id}] Result cache hit ({cache_key[:12]}), skipping GPU inference")
+            job["output_video"] = final_path
+            return {
+                "status": "success",
+                "output_video": final_path
+            }
+    except Exception as e:
+        # The cache is an optimization only; never fail the job because of it
+        logger.warning(f"[JOB {job_id}] Result cache lookup failed: {e}")
+
+    # 1️⃣ + 2️⃣ Call model. Generation is not idempotent: only failures where
+    # the backend never got the request (connect errors, 502/503/504) are
+    # retried, possibly on another backend of the pool.
+    backend, remote_filename = get_policy("gpu-generate", use_breaker=False, retryable=is_retryable_submission).call(
+        lambda: _generate(job)
+    )
+
+    # 3️⃣ + 4️⃣ Download immediately, from the file server of the backend that
+    # generated the output, straight to outputs/<uuid>.mp4
+    logger.info(f"[JOB {job_id}] Downloading output from file server to: {final_path}")
+    get_policy("gpu-download", use_breaker=False).call(
+        lambda: download_mp4(remote_filename, backend=backend, dest_path=final_path)
+    )
 
     logger.info(f"[JOB {job_id}] Output saved successfully")
     logger.info(f"[JOB {job_id}] Final file exists: {os.path.exists(final_path)}")
 
+    if cache_key:
+        try:
+            result_cache.store(cache_key, final_path)
+        except Exception as e:
+            logger.warning(f"[JOB {job_id}] Could not add output to result cache: {e}")
+
     # 5️⃣ Update job object
     job["output_video"] = final_path
 
@@ -80,29 +88,67 @@ def run_feature1_job(job):
     }
 
 
-def download_mp4(filename):
-    logger.info(f"[DOWNLOAD] Requesting file: {filename}")
-
-    response = requests.get(
-        DOWNLOAD_ENDPOINT,
-        params={"filename": filename},
-        stream=True,
-        timeout=300
-    )
+def _generate(job):
+    """Send the job's media to the least-loaded GPU backend; returns (backend, remote filename)."""
+    job_id = job["job_id"]
 
-    logger.info(f"[DOWNLOAD] HTTP status: {response.status_code}")
+    with get_gpu_pool().acquire() as backend:
+        logger.info(f"[JOB {job_id}] Sending video & audio to model at {backend.infer_url}")
+
+        # Stream both files from disk instead of building the body in memory
+        body = MultipartFileStream(
+            {
+                "media": (os.path.basename(job["input_video"]), job["input_video"], "video/mp4"),
+                "audio": (os.path.basename(job["input_audio"]), job["input_audio"], "audio/wav"),
+            },
+            progress=progress_logger(logger.info, f"[JOB {job_id}]"),
+        )
+        response = get_session().post(
+            backend.generate_endpoint,
+            data=body,
+            headers={"Content-Type": body.content_type},
+            timeout=(10, 1800)  # connect, read
+        )
+
+        logger.info(f"[JOB {job_id}] Model HTTP status: {response.status_code}")
+        logger.info(f"[JOB {job_id}] Model raw response: {response.text}")
+
+        check_response(response)
+        if response.status_code != 200:
+            raise Exception(f"Model failed: {response.text}")
 
-    if response.status_code != 200:
-        logger.error(f"[DOWNLOAD] Failed response: {response.text}")
-        raise Exception(f"Download failed: {response.text}")
+    data = response.json()
 
-    temp_path = os.path.join(os.getcwd(), f"_tmp_{filename}")
-    logger.info(f"[DOWNLOAD] Saving temp file at: {temp_path}")
+    if data.get("status") != "success":
+        raise Exception(f"Model returned non-success: {data}")
 
-    with open(temp_path, "wb") as f:
-        for chunk in response.iter_content(8192):
-            if chunk:
-                f.write(chunk)
+    # Extract remote filename (uuid_date-r.mp4)
+    remote_filename = data["video"].split("/")[-1]
+    logger.info(f"[JOB {job_id}] Model output filename: {remote_filename}")
 
-    logger.info(f"[DOWNLOAD] File written successfully")
-    return temp_path
+    return backend, remote_filename
+
+
+def download_mp4(filename, backend=None, dest_path=None):
+    """
+    Download a model output from the backend's file server straight to
+    `dest_path` (default: storage/outputs/<filename>), resuming dropped
+    connections. Returns the local path.
+    """
+    pool = get_gpu_pool()
+    if backend is None:
+        backend = pool.backends[0]
+    if dest_path is None:
+        dest_path = os.path.join(OUTPUT_DIR, filename)
+    logger.info(f"[DOWNLOAD] Requesting file: {filename} from {backend.file_url}")
+
+    with pool.use(backend):
+        download_file(
+            backend.download_endpoint,
+            dest_path,
+            params={"filename": filename},
+            timeout=300
+        )
+
+    logger.info(f"[DOWNLOAD] File written successfully to {dest_path}")
+    return dest_path
@@ -1,6 +1,7 @@
 # Executor for IntelliTutor (Feature 4) jobs
 import os
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 from services.intellitutor_ppt import parse_ppt
@@ -8,6 +9,11 @@ from services.intellitutor_tts import generate_slide_audio
 from services.intellitutor_video import compose_video
 from services.intellitutor_duix import submit_intellitutor
 from services.job_repository import update_job_status, update_job_output
+from services.cpu_pool import cpu_slot
+
+# Slides narrated at once per job. Each TTS provider also caps its own
+# calls in flight (TTS_PROVIDER_CONCURRENCY), across all jobs.
+SLIDE_TTS_WORKERS = int(os.getenv("SLIDE_TTS_WORKERS", "8"))
 
 
 def run_feature4_job(job: dict):
@@ -54,24 +60,27 @@ def run_feature4_job(job: dict):
     
     print(f"[IntelliTutor] Using TTS: gender={gender}")
     
-    audio_files = []
-    for i, text in enumerate(slide_texts):
+    def narrate(i):
         wav = os.path.join(workdir, f"slide_{i}.wav")
         print(f"[IntelliTutor] Generating audio for slide {i+1}/{len(slide_texts)}...")
-        generate_slide_audio(text, wav, gender=gender)
-        audio_files.append(wav)
+        return generate_slide_audio(slide_texts[i], wav, gender=gender)
+
+    # Slides are narrated concurrently; map() returns them in slide order
+    # and re-raises the first failure
+    with ThreadPoolExecutor(max_workers=max(1, min(SLIDE_TTS_WORKERS, len(slide_texts)))) as pool:
+        audio_files = list(pool.map(narrate, range(len(slide_texts))))
     print(f"[IntelliTutor] Generated {len(audio_files)} audio files")
 
     # 3) Merge narration
     print("\n[IntelliTutor][3] Merging narration audio...")
     from pydub import AudioSegment
 
-    combined = AudioSegment.silent(0)
-    for wav in audio_files:
-        combined += AudioSegment.from_wav(wav)
-
     narration_audio = os.path.join(workdir, "narration.wav")
-    combined.export(narration_audio, format="wav")
+    with cpu_slot():
+        combined = AudioSegment.silent(0)
+        for wav in audio_files:
+            combined += AudioSegment.from_wav(wav)
+        combined.export(narration_audio, format="wav")
 
     duration = combined.duration_seconds
     print(f"[IntelliTutor] Narration duration: {duration} seconds")
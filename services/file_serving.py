@@ -0,0 +1,119 @@
+# services/file_serving.py
+#
+# Serving of job outputs with HTTP caching and Range support:
+# - ETag / Last-Modified validators, answering If-None-Match and
+#   If-Modified-Since with 304;
+# - single-range "Range: bytes=..." requests answered with 206 (honouring
+#   If-Range), so video players can seek without re-downloading;
+# - optional offload to the reverse proxy (DOWNLOAD_OFFLOAD=x-accel for
+#   nginx's X-Accel-Redirect, x-sendfile for Apache/lighttpd), in which
+#   case the proxy sends the bytes and the API worker only checks access.
+
+import os
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+DOWNLOAD_OFFLOAD = os.getenv("DOWNLOAD_OFFLOAD", "").lower()
+# Internal nginx location that maps to storage/outputs (x-accel mode)
+X_ACCEL_PREFIX = os.getenv("X_ACCEL_PREFIX", "/protected-outputs/")
+
+SERVE_CHUNK_SIZE = 1024 * 1024  # 1 MB
+
+
+def _parse_range(header: str, size: int):
+    """
+    Parse a single "bytes=start-end" range.
+    Returns (start, end) inclusive, None to ignore the header (e.g. several
+    ranges), or raises ValueError if it cannot be satisfied.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    start_s, _, end_s = spec.strip().partition("-")
+    if start_s == "":
+        # Suffix range: the last N bytes
+        length = int(end_s)
+        if length <= 0:
+            raise ValueError("Empty suffix range")
+        return max(0, size - length), size - 1
+
+    start = int(start_s)
+    end = int(end_s) if end_s else size - 1
+    if start >= size or end < start:
+        raise ValueError("Range not satisfiable")
+    return start, min(end, size - 1)
+
+
+def _iter_file(path: str, start: int, end: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(SERVE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def serve_file(request: Request, path: str, media_type: str, filename: str) -> Response:
+    """Response for GET `path` with validators, Range support and optional proxy offload."""
+    st = os.stat(path)
+    etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+    last_modified = formatdate(st.st_mtime, usegmt=True)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f'attachment; filename="{filename}"',
+    }
+
+    if _not_modified(request, etag, st.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    if DOWNLOAD_OFFLOAD == "x-accel":
+        # nginx serves the file (including Range requests) from an internal location
+        headers["X-Accel-Redirect"] = X_ACCEL_PREFIX + os.path.basename(path)
+        return Response(headers=headers, media_type=media_type)
+    if DOWNLOAD_OFFLOAD == "x-sendfile":
+        headers["X-Sendfile"] = os.path.abspath(path)
+        return Response(headers=headers, media_type=media_type)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range in (etag, last_modified)):
+        try:
+            byte_range = _parse_range(range_header, st.st_size)
+        except ValueError:
+            headers["Content-Range"] = f"bytes */{st.st_size}"
+            return Response(status_code=416, headers=headers)
+
+        if byte_range is not None:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{st.st_size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(
+                _iter_file(path, start, end),
+                status_code=206,
+                headers=headers,
+                media_type=media_type,
+            )
+
+    return FileResponse(path=path, media_type=media_type, filename=filename, headers=headers, stat_result=st)
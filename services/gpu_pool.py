@@ -0,0 +1,211 @@
+# services/gpu_pool.py
+#
+# Registry of GPU inference backends (lipsync / Duix model servers).
+# Each backend is a model server (POST /generate) plus the file server
+# that hosts its outputs (GET /get_file). Requests go to the healthy
+# backend with the fewest requests in flight; backends that keep failing
+# are ejected (their circuit breaker opens) until a health probe reaches
+# them again, or the breaker's reset timeout lets one trial request through.
+#
+# GPU_BACKENDS="http://gpu1:7001|http://gpu1:7000,http://gpu2:7001|http://gpu2:7000"
+
+import os
+import time
+import random
+import threading
+from contextlib import contextmanager
+
+import requests
+
+from services.http_client import get_session
+from services.resilience import CircuitBreaker
+
+DEFAULT_GPU_BACKENDS = "http://154.201.127.0:7001|http://154.201.127.0:7000"
+
+GPU_BACKENDS = os.getenv("GPU_BACKENDS", DEFAULT_GPU_BACKENDS)
+# Path probed on each model server; any answer below 500 counts as healthy
+GPU_HEALTH_PATH = os.getenv("GPU_HEALTH_PATH", "/")
+GPU_HEALTH_INTERVAL = int(os.getenv("GPU_HEALTH_INTERVAL", "15"))  # seconds
+GPU_HEALTH_TIMEOUT = 3  # seconds
+# Consecutive failed calls before a backend is ejected
+GPU_EJECT_AFTER_FAILURES = int(os.getenv("GPU_EJECT_AFTER_FAILURES", "3"))
+
+
+class NoHealthyBackend(RuntimeError):
+    """Raised when every configured GPU backend is ejected."""
+
+
+class GpuBackend:
+    def __init__(self, infer_url: str, file_url: str):
+        self.infer_url = infer_url.rstrip("/")
+        self.file_url = file_url.rstrip("/")
+        self.generate_endpoint = f"{self.infer_url}/generate"
+        self.download_endpoint = f"{self.file_url}/get_file"
+        self.in_flight = 0
+        # Last health probe result
+        self.healthy = True
+        # Opens after GPU_EJECT_AFTER_FAILURES failed calls in a row
+        self.breaker = CircuitBreaker(f"gpu {self.infer_url}", failure_threshold=GPU_EJECT_AFTER_FAILURES)
+        self.last_error = None
+
+    @property
+    def available(self) -> bool:
+        return self.healthy and not self.breaker.is_open
+
+    def __repr__(self):
+        state = "available" if self.available else "ejected"
+        return f"<GpuBackend {self.infer_url} {state} in_flight={self.in_flight}>"
+
+
+def _parse_backends(value: str) -> list:
+    backends = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        if "|" in item:
+            infer_url, file_url = item.split("|", 1)
+        else:
+            # Same server hosts both inference and files
+            infer_url = file_url = item
+        backends.append(GpuBackend(infer_url.strip(), file_url.strip()))
+    return backends
+
+
+class GpuPool:
+    """
+    Least-outstanding-requests router over a set of GpuBackends.
+
+        with get_gpu_pool().acquire() as backend:
+            session.post(backend.generate_endpoint, ...)
+    """
+
+    def __init__(self, backends: list):
+        if not backends:
+            raise ValueError("At least one GPU backend must be configured")
+        self.backends = backends
+        self.lock = threading.Lock()
+        self._prober = None
+
+    def available_backends(self) -> list:
+        with self.lock:
+            return [b for b in self.backends if b.available]
+
+    def has_available_backend(self) -> bool:
+        """False while every backend is down; the scheduler pauses GPU lanes then."""
+        return bool(self.available_backends())
+
+    def _pick(self) -> GpuBackend:
+        with self.lock:
+            available = [b for b in self.backends if b.available]
+            # Least loaded first, ties in random order
+            random.shuffle(available)
+            available.sort(key=lambda b: b.in_flight)
+            for backend in available:
+                # A half-open breaker admits a single trial request
+                if backend.breaker.allow():
+                    backend.in_flight += 1
+                    return backend
+            raise NoHealthyBackend(f"No healthy GPU backend among {self.backends}")
+
+    def mark_success(self, backend: GpuBackend):
+        backend.breaker.record_success()
+
+    def mark_failure(self, backend: GpuBackend, error):
+        backend.last_error = str(error)
+        backend.breaker.record_failure(error)
+
+    @contextmanager
+    def acquire(self):
+        """
+        Reserve the least-loaded healthy backend for one request/response cycle.
+        Network errors and transient statuses (RetryableHTTPError) count
+        against the backend; other errors (bad input, model-level failures)
+        do not.
+        """
+        self.start_health_checks()
+        backend = self._pick()
+        with self._tracked(backend):
+            yield backend
+
+    @contextmanager
+    def use(self, backend: GpuBackend):
+        """Like acquire(), but for a specific backend (e.g. to download its outputs)."""
+        with self.lock:
+            backend.in_flight += 1
+        with self._tracked(backend):
+            yield backend
+
+    @contextmanager
+    def _tracked(self, backend: GpuBackend):
+        try:
+            yield backend
+        except requests.exceptions.RequestException as exc:
+            self.mark_failure(backend, exc)
+            raise
+        except Exception:
+            # Not the backend's fault; hand back a trial we may hold
+            backend.breaker.release_trial()
+            raise
+        else:
+            self.mark_success(backend)
+        finally:
+            with self.lock:
+                backend.in_flight -= 1
+
+    def probe(self, backend: GpuBackend) -> bool:
+        try:
+            response = get_session().get(backend.infer_url + GPU_HEALTH_PATH, timeout=GPU_HEALTH_TIMEOUT)
+        except requests.exceptions.RequestException as exc:
+            backend.last_error = str(exc)
+            return False
+        # The probe path may not exist (404 is fine), but a 5xx means the
+        # server is up and broken
+        if response.status_code >= 500:
+            backend.last_error = f"health probe returned {response.status_code}"
+            return False
+        return True
+
+    def probe_all(self):
+        for backend in list(self.backends):
+            ok = self.probe(backend)
+            with self.lock:
+                if ok and not backend.healthy:
+                    print(f"🟢 GPU backend {backend.infer_url} healthy again")
+                elif not ok and backend.healthy:
+                    print(f"🔴 GPU backend {backend.infer_url} failed health check → {backend.last_error}")
+                backend.healthy = ok
+            if ok and backend.breaker.opened_at is not None:
+                # The probe reached it: re-admit a backend its breaker ejected
+                backend.breaker.record_success()
+
+    def start_health_checks(self):
+        if self._prober is not None:
+            return
+        with self.lock:
+            if self._prober is not None:
+                return
+            self._prober = threading.Thread(target=self._probe_loop, name="gpu-health", daemon=True)
+            self._prober.start()
+
+    def _probe_loop(self):
+        while True:
+            try:
+                self.probe_all()
+            except Exception as exc:
+                print(f"🔴 GPU health check error → {exc}")
+            time.sleep(GPU_HEALTH_INTERVAL)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_gpu_pool() -> GpuPool:
+    """Return the process-wide GPU pool built from GPU_BACKENDS."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = GpuPool(_parse_backends(GPU_BACKENDS))
+    return _pool
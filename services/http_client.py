@@ -0,0 +1,32 @@
+# services/http_client.py
+#
+# Shared HTTP session for outbound calls (GPU model server, file server,
+# Groq). Reusing one pooled session keeps TCP/TLS connections alive
+# between calls and lets many scheduler slots wait on remote services at
+# once without opening a new connection per request.
+
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Max pooled connections per host; should cover SCHEDULER_SLOTS
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "32"))
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide pooled requests session."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
@@ -1,15 +1,15 @@
 # Client for Duix avatar generation used in IntelliTutor (Feature 4)
 import os
-import time
 import subprocess
-import requests
 
-# ---------------- CONFIG ----------------
-GENERATE_ENDPOINT = "http://154.201.127.0:7001/generate"
-DOWNLOAD_ENDPOINT = "http://154.201.127.0:7000/get_file"
+from services.http_client import get_session
+from services.gpu_pool import get_gpu_pool
+from services.resilience import get_policy, check_response, is_retryable_submission
+from services.multipart_stream import MultipartFileStream, progress_logger
+from services.downloader import download_file
 
-POLL_INTERVAL = 5
-MAX_WAIT_TIME = 600
+# ---------------- CONFIG ----------------
+# Generate/download endpoints come from services/gpu_pool.py (GPU_BACKENDS)
 
 
 def _validate_mp4(path: str):
@@ -25,61 +25,44 @@ def _validate_mp4(path: str):
         raise RuntimeError("Downloaded avatar.mp4 is INVALID")
 
 
-def _download_video(url: str, output_path: str):
+def submit_intellitutor(face_path: str, audio_path: str, output_video: str) -> str:
     """
-    Download video from Duix.
-    Supports JSON indirection + final MP4 download.
+    Submit a job to Duix and download the resulting avatar video.
+    Generation is retried (possibly on another backend) only if the backend
+    never got the request; the download is retried on any transient error.
     """
-    r = requests.get(url, timeout=300)
-    ct = r.headers.get("content-type", "").lower()
-
-    # Case 1: Direct MP4
-    if "video" in ct:
-        with open(output_path, "wb") as f:
-            f.write(r.content)
-        _validate_mp4(output_path)
-        return
-
-    # Case 2: JSON indirection
-    if "application/json" in ct:
-        data = r.json()
-        filename = data.get("file") or data.get("filename")
-        if not filename:
-            raise RuntimeError(f"Download JSON missing filename: {data}")
-
-        final_url = f"{DOWNLOAD_ENDPOINT}?filename={filename}"
-        r2 = requests.get(final_url, stream=True, timeout=300)
-        ct2 = r2.headers.get("content-type", "").lower()
-
-        if "video" not in ct2:
-            raise RuntimeError(f"Final download not video, content-type={ct2}")
+    backend, filename = get_policy("duix-generate", use_breaker=False, retryable=is_retryable_submission).call(
+        lambda: _generate(face_path, audio_path)
+    )
 
-        with open(output_path, "wb") as f:
-            for chunk in r2.iter_content(8192):
-                if chunk:
-                    f.write(chunk)
+    # Download from the same backend that generated the video
+    get_policy("duix-download", use_breaker=False).call(
+        lambda: _download_output(backend, filename, output_video)
+    )
 
-        _validate_mp4(output_path)
-        return
+    _validate_mp4(output_video)
+    return output_video
 
-    raise RuntimeError(f"Unsupported download response: content-type={ct}")
 
+def _generate(face_path: str, audio_path: str):
+    pool = get_gpu_pool()
 
-def submit_intellitutor(face_path: str, audio_path: str, output_video: str) -> str:
-    """
-    Submit a job to Duix and download the resulting avatar video.
-    """
     # 1. Call generate endpoint
-    with open(face_path, "rb") as fv, open(audio_path, "rb") as fa:
-        r = requests.post(
-            GENERATE_ENDPOINT,
-            headers={"accept": "application/json"},
-            files={
-                "media": ("face.mp4", fv, "video/mp4"),
-                "audio": ("audio.wav", fa, "audio/wav"),
-            },
-            timeout=300,
+    body = MultipartFileStream(
+        {
+            "media": ("face.mp4", face_path, "video/mp4"),
+            "audio": ("audio.wav", audio_path, "audio/wav"),
+        },
+        progress=progress_logger(print, "[IntelliTutor][Duix]"),
+    )
+    with pool.acquire() as backend:
+        r = get_session().post(
+            backend.generate_endpoint,
+            headers={"accept": "application/json", "Content-Type": body.content_type},
+            data=body,
+            timeout=(10, 300),  # connect, read
         )
+        check_response(r)
 
     if r.status_code != 200:
         raise RuntimeError(f"Generate failed: {r.text}")
@@ -89,24 +72,15 @@ def submit_intellitutor(face_path: str, audio_path: str, output_video: str) -> s
     if "video" not in data:
         raise RuntimeError(f"Unexpected generate response: {data}")
 
-    filename = os.path.basename(data["video"])
-
-    # 3. Download using download endpoint
-    resp = requests.get(
-        DOWNLOAD_ENDPOINT,
-        params={"filename": filename},
-        stream=True,
-        timeout=300,
-    )
+    return backend, os.path.basename(data["video"])
 
-    if resp.status_code != 200:
-        raise RuntimeError(f"Download failed: {resp.text}")
-
-    with open(output_video, "wb") as f:
-        for chunk in resp.iter_content(8192):
-            if chunk:
-                f.write(chunk)
-
-    _validate_mp4(output_video)
-    return output_video
 
+def _download_output(backend, filename: str, output_video: str):
+    # 2. Download using download endpoint
+    with get_gpu_pool().use(backend):
+        download_file(
+            backend.download_endpoint,
+            output_video,
+            params={"filename": filename},
+            timeout=300,
+        )
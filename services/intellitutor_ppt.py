@@ -1,66 +1,204 @@
 # PPT parsing and summarization for IntelliTutor (Feature 4)
 import os
-import subprocess
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 import fitz
 from pptx import Presentation
-import requests
 from dotenv import load_dotenv
 
+from services.http_client import get_session
+from services.libreoffice_pool import convert_to_pdf
+from services.slide_raster import rasterize_pdf
+from services.resilience import get_policy, check_response, RateLimiter, NotAttemptedError
+
 load_dotenv()
 
 GROQ_ENDPOINT = "https://api.groq.com/openai/v1/chat/completions"
+GROQ_MODEL = "llama-3.1-8b-instant"
+SUMMARY_SYSTEM_PROMPT = (
+    "Produce a clear, concise summary of the provided content. "
+    "Write it in a natural speaking pace with short, smooth sentences. "
+    "Do NOT include phrases like 'here is the summary', "
+    "'explanation', or 'narration'. "
+    "Only output the summary text."
+)
+SUMMARY_MAX_TOKENS = 200
+SUMMARY_TEMPERATURE = 0.3
+
+# Summaries requested at once (process-wide) and Groq's request rate limit
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", "4"))
+GROQ_REQUESTS_PER_MINUTE = float(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30"))
+# Per request; a slow Groq falls back to the raw text instead of waiting
+GROQ_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", "15"))  # seconds
+# Whole deck: slides not summarized by then use their raw text. This is
+# the allowance for a slow LLM; the time the rate limit needs to issue a
+# request for every slide is added on top (see _summary_deadline)
+SUMMARY_DEADLINE = float(os.getenv("SUMMARY_DEADLINE", "30"))  # seconds
+
+# Successful summaries, keyed by slide text + model/prompt settings
+SUMMARY_CACHE_DIR = "storage/cache/summaries"
+
+_groq_limiter = RateLimiter(GROQ_REQUESTS_PER_MINUTE / 60, burst=SUMMARY_WORKERS)
+_summary_executor = ThreadPoolExecutor(max_workers=SUMMARY_WORKERS, thread_name_prefix="groq-summary")
+
+
+def _summary_cache_path(text: str) -> str:
+    settings = json.dumps({
+        "model": GROQ_MODEL,
+        "prompt": SUMMARY_SYSTEM_PROMPT,
+        "max_tokens": SUMMARY_MAX_TOKENS,
+        "temperature": SUMMARY_TEMPERATURE,
+        "text": text,
+    }, sort_keys=True)
+    key = hashlib.sha256(settings.encode("utf-8")).hexdigest()
+    return os.path.join(SUMMARY_CACHE_DIR, f"{key}.txt")
+
+
+def _read_cached_summary(text: str):
+    try:
+        with open(_summary_cache_path(text), "r", encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
 
 
-def _summarize_with_groq(text: str) -> str:
-    api_key = os.getenv("GROQ_API_KEY")
-    if not api_key or not text.strip():
-        print("🔴 Groq API key missing or text is empty")
-        return text
+def _write_cached_summary(text: str, summary: str):
+    path = _summary_cache_path(text)
+    os.makedirs(SUMMARY_CACHE_DIR, exist_ok=True)
+    tmp = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(summary)
+    os.replace(tmp, path)
+
 
+def _summarize_with_groq(text: str, api_key: str, deadline: float) -> str:
+    """
+    One Groq summary, or None if it could not be had before `deadline`
+    (time.monotonic()) or failed. Successful summaries are cached.
+    """
     payload = {
-        "model": "llama-3.1-8b-instant",
+        "model": GROQ_MODEL,
         "messages": [
-            {
-                "role": "system",
-                "content": (
-                    "Produce a clear, concise summary of the provided content. "
-                    "Write it in a natural speaking pace with short, smooth sentences. "
-                    "Do NOT include phrases like 'here is the summary', "
-                    "'explanation', or 'narration'. "
-                    "Only output the summary text."
-                )
-            },
+            {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
             {"role": "user", "content": text}
         ],
-        "max_tokens": 200,
-        "temperature": 0.3,
+        "max_tokens": SUMMARY_MAX_TOKENS,
+        "temperature": SUMMARY_TEMPERATURE,
     }
-    try:
-        r = requests.post(
+
+    def post():
+        # Runs per attempt, so retries also respect the rate and deadline.
+        # NotAttemptedError is neither retried nor held against Groq's breaker
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise NotAttemptedError("Summary deadline passed")
+        if not _groq_limiter.acquire(timeout=remaining):
+            raise NotAttemptedError("Groq rate limit: no request slot before the deadline")
+        response = get_session().post(
             GROQ_ENDPOINT,
             headers={
                 "Authorization": f"Bearer {api_key}",
                 "Content-Type": "application/json",
             },
             json=payload,
-            timeout=60,
+            timeout=min(GROQ_TIMEOUT, max(1, deadline - time.monotonic())),
         )
+        if response.status_code == 429:
+            # Every worker waits out Groq's limit, not just this one
+            try:
+                retry_after = float(response.headers.get("Retry-After", "5"))
+            except ValueError:
+                retry_after = 5
+            _groq_limiter.pause(retry_after)
+        return check_response(response)
+
+    try:
+        # While the "groq" breaker is open this raises at once and the raw
+        # text is used, instead of waiting for every slide to time out
+        r = get_policy("groq").call(post)
 
         if r.status_code != 200:
-            return text
+            return None
 
-        return r.json()["choices"][0]["message"]["content"].strip()
+        summary = r.json()["choices"][0]["message"]["content"].strip()
     except Exception as e:
         print(f"🔴 Groq API error: {e}")
-        return text
+        return None
+
+    try:
+        _write_cached_summary(text, summary)
+    except OSError as e:
+        print(f"⚠️ Summary cache write failed: {e}")
+    return summary
+
+
+def _summary_deadline(requests: int) -> float:
+    """
+    Seconds to wait for `requests` summaries: SUMMARY_DEADLINE plus the
+    time the rate limiter needs to issue them all, so a healthy Groq
+    summarizes every slide however long the deck is.
+    """
+    rate = GROQ_REQUESTS_PER_MINUTE / 60
+    queued = max(0, requests - _groq_limiter.burst)
+    return SUMMARY_DEADLINE + (queued / rate if rate > 0 else 0)
+
+
+def summarize_slides(texts):
+    """
+    Summaries for all slides, in order. Cached slides cost nothing; the
+    rest are requested concurrently (SUMMARY_WORKERS, rate limited).
+    Any slide without a summary by the deadline (_summary_deadline) keeps
+    its raw text. Requests that had not started by then are cancelled so
+    they do not eat into the next deck's rate budget.
+    """
+    summaries = list(texts)
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        print("🔴 Groq API key missing, using raw slide text")
+        return summaries
+
+    pending = []
+    for idx, text in enumerate(texts):
+        if not text.strip():
+            continue
+        cached = _read_cached_summary(text)
+        if cached is not None:
+            summaries[idx] = cached
+            continue
+        pending.append((idx, text))
+
+    budget = _summary_deadline(len(pending))
+    deadline = time.monotonic() + budget
+    futures = {
+        _summary_executor.submit(_summarize_with_groq, text, api_key, deadline): idx
+        for idx, text in pending
+    }
+
+    print(f"Summarizing {len(futures)} of {len(texts)} slides ({len(texts) - len(futures)} cached or empty)")
+    done, not_done = wait(futures, timeout=budget)
+    for future in done:
+        summary = future.result()
+        if summary:
+            summaries[futures[future]] = summary
+    if not_done:
+        for future in not_done:
+            # Only stops requests that have not started; running ones end
+            # at the deadline (rate limiter wait and request timeout)
+            future.cancel()
+        print(f"⚠️ {len(not_done)} slide summaries missed the {budget:.0f}s deadline; using raw text")
+
+    return summaries
 
 
 def parse_ppt(ppt_path: str, output_dir: str):
     """
     1. Extract text from PPT slides
-    2. Summarize each slide via Groq
-    3. Convert PPT -> PDF using LibreOffice
-    4. Render each slide as PNG
+    2. Summarize the slides via Groq (concurrent, cached)
+    3. Convert PPT -> PDF using the LibreOffice pool
+    4. Render each slide as a 1280x720 frame (PNG or raw RGB)
     """
     os.makedirs(output_dir, exist_ok=True)
 
@@ -79,38 +217,23 @@ def parse_ppt(ppt_path: str, output_dir: str):
     # -----------------------------
     # Summarize slide text
     # -----------------------------
-    slide_texts = []
-    for idx, text in enumerate(raw_texts):
-        logger.info("Summarizing slide %d", idx + 1)
-        slide_texts.append(_summarize_with_groq(text))
+    slide_texts = summarize_slides(raw_texts)
 
     # -----------------------------
-    # Convert PPT -> PDF via libreoffice
+    # Convert PPT -> PDF via libreoffice (warm pooled instance)
     # -----------------------------
-    subprocess.run(
-        ["soffice", "--headless", "--convert-to", "pdf", ppt_path, "--outdir", output_dir],
-        check=True,
-        timeout=120,
-    )
-
-    pdf_name = os.path.splitext(os.path.basename(ppt_path))[0] + ".pdf"
-    pdf_path = os.path.join(output_dir, pdf_name)
+    pdf_path = convert_to_pdf(ppt_path, output_dir)
 
     if not os.path.exists(pdf_path):
         raise RuntimeError("PDF conversion failed")
 
     # -----------------------------
-    # Render slides as images
+    # Render slides as video frames (1280x720, in parallel)
     # -----------------------------
-    doc = fitz.open(pdf_path)
-
-    slide_images = []
-    for i in range(len(doc)):
-        page = doc.load_page(i)
-        pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-        img_path = os.path.join(output_dir, f"slide_{i}.png")
-        pix.save(img_path)
-        slide_images.append(img_path)
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count
+
+    slide_images = rasterize_pdf(pdf_path, output_dir, page_count)
 
     return {
         "slide_images": slide_images,
@@ -2,14 +2,18 @@
 import os
 import subprocess
 
+from services.cpu_pool import run_cpu_bound
+from services.slide_raster import SLIDE_WIDTH, SLIDE_HEIGHT
 
-def compose_video(slide_images, avatar_video, duration, output_video):
-    per_slide = duration / len(slide_images)
+
+def _png_slides_background(slide_images, per_slide, output_video, bg):
+    """One clip per slide image, then concatenated into the background video."""
     slide_videos = []
 
     for i, img in enumerate(slide_images):
         out = output_video.replace(".mp4", f"_slide_{i}.mp4")
-        subprocess.run(
+        run_cpu_bound(
+            subprocess.run,
             ["ffmpeg", "-y", "-loop", "1", "-i", img, "-t", str(per_slide),
              "-vf", "scale=1280:720", "-c:v", "libx264", "-pix_fmt", "yuv420p", out],
             check=True,
@@ -25,8 +29,8 @@ def compose_video(slide_images, avatar_video, duration, output_video):
             # can resolve files relative to storage/outputs/...
             f.write(f"file '{os.path.basename(v)}'\n")
 
-    bg = output_video.replace(".mp4", "_bg.mp4")
-    subprocess.run(
+    run_cpu_bound(
+        subprocess.run,
         [
             "ffmpeg",
             "-y",
@@ -43,7 +47,52 @@ def compose_video(slide_images, avatar_video, duration, output_video):
         check=True,
     )
 
-    subprocess.run(
+
+def _raw_slides_background(slide_frames, per_slide, bg):
+    """
+    Encode raw RGB24 slide frames (services/slide_raster, "raw" format) into
+    the background video with one ffmpeg, streaming the frames to its stdin.
+    Every slide lasts per_slide seconds, so the input frame rate is one
+    frame per slide and the fps filter repeats it at 25 fps (tpad holds
+    the last slide so it is not cut short; -t trims to the exact length).
+    """
+    total = per_slide * len(slide_frames)
+
+    def encode():
+        proc = subprocess.Popen(
+            ["ffmpeg", "-y",
+             "-f", "rawvideo", "-pix_fmt", "rgb24",
+             "-video_size", f"{SLIDE_WIDTH}x{SLIDE_HEIGHT}",
+             "-framerate", f"1/{per_slide}",
+             "-i", "pipe:0",
+             "-vf", f"tpad=stop_mode=clone:stop_duration={per_slide},fps=25",
+             "-t", str(total),
+             "-c:v", "libx264", "-pix_fmt", "yuv420p", bg],
+            stdin=subprocess.PIPE,
+        )
+        try:
+            for frame in slide_frames:
+                with open(frame, "rb") as f:
+                    proc.stdin.write(f.read())
+        finally:
+            proc.stdin.close()
+        if proc.wait() != 0:
+            raise subprocess.CalledProcessError(proc.returncode, "ffmpeg")
+
+    run_cpu_bound(encode)
+
+
+def compose_video(slide_images, avatar_video, duration, output_video):
+    per_slide = duration / len(slide_images)
+    bg = output_video.replace(".mp4", "_bg.mp4")
+
+    if all(img.endswith(".rgb") for img in slide_images):
+        _raw_slides_background(slide_images, per_slide, bg)
+    else:
+        _png_slides_background(slide_images, per_slide, output_video, bg)
+
+    run_cpu_bound(
+        subprocess.run,
         ["ffmpeg", "-y", "-i", bg, "-i", avatar_video,
          "-filter_complex", "[1:v]scale=300:-1[av];[0:v][av]overlay=W-w-20:H-h-20",
          "-map", "0:v", "-map", "1:a?", "-shortest", output_video],
@@ -1,10 +1,20 @@
 import os
+import time
+import threading
 
 from services.feature1_executor import run_feature1_job
 from services.feature4_executor import run_feature4_job
-from services.job_repository import update_job_status
+from services.tts_stage import ensure_job_audio
+from services.storage_cleanup import remove_job_uploads
+from services.job_repository import update_job_status, renew_job_lease, release_job, LEASE_SECONDS, NODE_ID
+from services.gpu_pool import NoHealthyBackend
 from datetime import datetime
 
+HEARTBEAT_INTERVAL = max(1, LEASE_SECONDS // 3)  # seconds
+# A job that could not reach its backend waits this long before going back
+# to the queue, so an outage does not turn into a claim/requeue loop
+REQUEUE_DELAY = 5  # seconds
+
 
 def _normalize_path(path: str) -> str:
     """
@@ -17,6 +27,31 @@ def _normalize_path(path: str) -> str:
     return os.path.normpath(path.replace("\\", os.sep))
 
 
+class LeaseHeartbeat(threading.Thread):
+    """
+    Renews the job lease while the job runs, so the scheduler's reaper
+    only recovers jobs whose worker really died.
+    """
+
+    def __init__(self, job_id: str):
+        super().__init__(name=f"heartbeat-{job_id}", daemon=True)
+        self.job_id = job_id
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(HEARTBEAT_INTERVAL):
+            try:
+                if not renew_job_lease(self.job_id):
+                    print(f"⚠️ Job {self.job_id} lost its lease (no longer IN_PROGRESS)")
+                    return
+            except Exception as exc:
+                # Keep trying: a missed beat is fine as long as the lease holds
+                print(f"⚠️ Heartbeat failed for job {self.job_id} → {exc}")
+
+    def stop(self):
+        self.stopped.set()
+
+
 def execute_job(job):
     # Make a shallow copy so we can safely modify paths
     job = dict(job)
@@ -28,15 +63,15 @@ def execute_job(job):
 
     job_id = job["job_id"]
 
-    # Mark job started
-    started_at = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-    update_job_status(
-        job_id=job_id,
-        status="IN_PROGRESS",
-        started_at=started_at,
-    )
+    # The job was already marked IN_PROGRESS when the scheduler claimed it
+    # (see job_repository.claim_next_job); keep its lease alive while it runs
+    heartbeat = LeaseHeartbeat(job_id)
+    heartbeat.start()
 
     try:
+        # Text jobs: generate speech first (no-op when the audio exists)
+        ensure_job_audio(job)
+
         # Dispatch based on feature
         feature = job.get("feature") or "Avatar Sync Studio"
         if feature == "IntelliTutor":
@@ -46,22 +81,40 @@ def execute_job(job):
 
         # Mark completed
         completed_at = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-        update_job_status(
+        if update_job_status(
             job_id=job_id,
             status="COMPLETED",
             completed_at=completed_at,
-        )
-        print(f"🟢 Job {job_id} COMPLETED")
+            claimed_by=NODE_ID,
+        ):
+            print(f"🟢 Job {job_id} COMPLETED")
+            remove_job_uploads(job_id)
+        else:
+            print(f"⚠️ Job {job_id} finished but is no longer owned by {NODE_ID}; result not recorded")
+
+    except NoHealthyBackend as exc:
+        # The backend is down, not the job: requeue it (the lease is kept
+        # alive meanwhile) instead of failing it
+        print(f"⚠️ Job {job_id} could not run → {exc}; requeueing in {REQUEUE_DELAY}s")
+        time.sleep(REQUEUE_DELAY)
+        try:
+            if not release_job(job_id):
+                print(f"⚠️ Job {job_id} is no longer owned by {NODE_ID}; not requeued")
+        except Exception as release_exc:
+            # The lease reaper requeues it once the lease expires
+            print(f"🔴 Could not requeue job {job_id} → {release_exc}")
 
     except Exception as exc:
         # On any failure, mark job as FAILED so the scheduler can move on
         failed_at = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
         try:
-            update_job_status(
+            if update_job_status(
                 job_id=job_id,
                 status="FAILED",
                 completed_at=failed_at,
-            )
+                claimed_by=NODE_ID,
+            ):
+                remove_job_uploads(job_id)
         except Exception:
             # Avoid crashing if even the status update fails
             pass
@@ -71,4 +124,6 @@ def execute_job(job):
         import traceback
 
         traceback.print_exc()
-        # Do NOT re-raise, so the scheduler loop can continue to next job
+        # Do NOT re-raise, so the scheduler slot can pick up the next job
+    finally:
+        heartbeat.stop()
@@ -1,5 +1,9 @@
 # services/job_repository.py
 
+import os
+import socket
+from datetime import datetime
+
 import psycopg2.extras
 from db import get_db_connection, return_db_connection
 
@@ -7,6 +11,42 @@ STATUS_QUEUED = "QUEUED"
 STATUS_IN_PROGRESS = "IN_PROGRESS"
 STATUS_COMPLETED = "COMPLETED"
 STATUS_FAILED = "FAILED"
+# Parent row of a batch; never claimed, leased or counted as running
+STATUS_BATCH = "BATCH"
+
+DEFAULT_FEATURE = "Avatar Sync Studio"
+
+# A claimed job is owned by its worker until the lease expires.
+# Workers renew it every LEASE_SECONDS / 3 while the job runs.
+LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "60"))
+# Claims per job before an expired lease fails the job instead of requeueing it
+MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+# Identity of this scheduler node, recorded on the jobs it claims.
+# Several schedulers (on one or many hosts) can drain the same queue.
+NODE_ID = os.getenv("SCHEDULER_NODE_ID", f"{socket.gethostname()}:{os.getpid()}")
+
+# Advisory lock key so only one node at a time runs the lease reaper
+REAPER_LOCK_KEY = 7_310_001
+# Advisory lock key serializing claims while PER_USER_MAX_RUNNING is set
+CLAIM_LOCK_KEY = 7_310_002
+
+# Job selection policy: "fair" (round-robin across users) or "fifo"
+JOB_FAIRNESS_POLICY = os.getenv("JOB_FAIRNESS_POLICY", "fair").lower()
+# Max jobs one user may have running at once, under either policy (0 = no cap)
+PER_USER_MAX_RUNNING = int(os.getenv("PER_USER_MAX_RUNNING", "0"))
+
+# Postgres channel the scheduler LISTENs on for newly queued jobs
+JOB_QUEUED_CHANNEL = "job_queued"
+
+
+def notify_job_queued(cursor, job_id):
+    """
+    Wake up listening schedulers for a newly inserted job.
+    Call this with the cursor that inserted the row: Postgres only
+    delivers the notification when that transaction commits.
+    """
+    cursor.execute("SELECT pg_notify(%s, %s)", (JOB_QUEUED_CHANNEL, job_id))
 
 def fetch_oldest_pending_job():
     conn = get_db_connection()
@@ -31,27 +71,330 @@ def fetch_oldest_pending_job():
     return result
 
 
-def update_job_status(job_id, status, started_at=None, completed_at=None):
+def _next_job_query(feature_filter, feature_params):
+    """
+    Build the sub-select that picks (and row-locks) the next job to run.
+
+    "fifo": strictly oldest first.
+    "fair": round-robin across users. Each queued job gets a turn number:
+        its position in its owner's queue plus the owner's running jobs.
+        Lowest turn wins, ties go to the oldest job, so one user's large
+        batch is interleaved with everyone else's jobs instead of
+        blocking them.
+    Under both policies, users already running PER_USER_MAX_RUNNING jobs
+    are skipped entirely (0 = no cap).
+    """
+    if JOB_FAIRNESS_POLICY == "fifo":
+        cap_filter = ""
+        cap_params = []
+        if PER_USER_MAX_RUNNING > 0:
+            cap_filter = """AND (
+                SELECT COUNT(*) FROM jobs r
+                WHERE r.user_id = q.user_id AND r.status = %s
+            ) < %s"""
+            cap_params = [STATUS_IN_PROGRESS, PER_USER_MAX_RUNNING]
+
+        return f"""
+            SELECT job_id FROM jobs q
+            WHERE status = %s
+            {feature_filter}
+            {cap_filter}
+            ORDER BY created_at ASC
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED
+        """, [STATUS_QUEUED] + feature_params + cap_params
+
+    cap_filter = ""
+    cap_params = []
+    if PER_USER_MAX_RUNNING > 0:
+        cap_filter = "AND COALESCE(r.running, 0) < %s"
+        cap_params = [PER_USER_MAX_RUNNING]
+
+    return f"""
+        WITH running AS (
+            SELECT user_id, COUNT(*) AS running
+            FROM jobs
+            WHERE status = %s
+            GROUP BY user_id
+        ),
+        candidates AS (
+            SELECT q.job_id,
+                   q.created_at,
+                   ROW_NUMBER() OVER (PARTITION BY q.user_id ORDER BY q.created_at)
+                       + COALESCE(r.running, 0) AS turn
+            FROM jobs q
+            LEFT JOIN running r ON r.user_id = q.user_id
+            WHERE q.status = %s
+            {feature_filter}
+            {cap_filter}
+        )
+        SELECT j.job_id
+        FROM jobs j
+        JOIN candidates c ON c.job_id = j.job_id
+        WHERE j.status = %s
+        ORDER BY c.turn ASC, c.created_at ASC
+        LIMIT 1
+        FOR UPDATE OF j SKIP LOCKED
+    """, [STATUS_IN_PROGRESS, STATUS_QUEUED] + feature_params + cap_params + [STATUS_QUEUED]
+
+
+def claim_next_job(include_features=None, exclude_features=None):
+    """
+    Atomically claim the next QUEUED job and mark it IN_PROGRESS.
+
+    The job is chosen by JOB_FAIRNESS_POLICY (see _next_job_query).
+    FOR UPDATE SKIP LOCKED makes concurrent callers (several scheduler slots,
+    or several scheduler processes) skip rows another transaction is already
+    claiming, so a job can never be handed out twice.
+    Only jobs whose feature is in `include_features` (if given) and not in
+    `exclude_features` are considered; this is how scheduler lanes select
+    their own jobs.
+    With PER_USER_MAX_RUNNING set, claims take a transaction-scoped
+    advisory lock first: otherwise two claimers could both see a user
+    below the cap and together exceed it.
+    Returns the claimed job as a dict, or None if nothing is claimable.
+    """
     conn = get_db_connection()
     cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
 
+    feature_filter = ""
+    feature_params = []
+    if include_features is not None:
+        feature_filter += "AND COALESCE(feature, %s) = ANY(%s)\n"
+        feature_params += [DEFAULT_FEATURE, list(include_features)]
+    if exclude_features:
+        feature_filter += "AND COALESCE(feature, %s) <> ALL(%s)\n"
+        feature_params += [DEFAULT_FEATURE, list(exclude_features)]
+
+    next_job_sql, next_job_params = _next_job_query(feature_filter, feature_params)
+    started_at = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
     try:
-        if started_at:
-            cursor.execute(
-                "UPDATE jobs SET status=%s, started_at=%s WHERE job_id=%s",
-                (status, started_at, job_id)
-            )
-        elif completed_at:
-            cursor.execute(
-                "UPDATE jobs SET status=%s, completed_at=%s WHERE job_id=%s",
-                (status, completed_at, job_id)
-            )
-        else:
-            cursor.execute(
-                "UPDATE jobs SET status=%s WHERE job_id=%s",
-                (status, job_id)
+        if PER_USER_MAX_RUNNING > 0:
+            # Released at commit, so the next claimer's snapshot sees this claim
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", (CLAIM_LOCK_KEY,))
+
+        cursor.execute(f"""
+            UPDATE jobs
+            SET status = %s, started_at = %s,
+                lease_expires_at = NOW() + %s * INTERVAL '1 second',
+                attempts = attempts + 1,
+                claimed_by = %s
+            WHERE job_id = (
+                {next_job_sql}
             )
+            RETURNING *
+        """, [STATUS_IN_PROGRESS, started_at, LEASE_SECONDS, NODE_ID] + next_job_params)
+
+        row = cursor.fetchone()
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        raise
+    finally:
+        return_db_connection(conn)
+
+    return {k: v for k, v in row.items()} if row else None
+
+
+def _record_finished_jobs(conn, finished):
+    """
+    Propagate finished jobs along job_edges: bump the completed / failed
+    counters of every downstream job (e.g. a batch parent) and close the
+    downstream jobs whose upstream jobs have all finished. A downstream
+    job fails only if every upstream job failed.
+    `finished` is a list of (job_id, status) that just became terminal;
+    runs in the caller's transaction so counters move with the status.
+    """
+    if not finished:
+        return
+
+    cursor = conn.cursor()
+    job_ids = [job_id for job_id, _ in finished]
+    statuses = [status for _, status in finished]
+
+    cursor.execute("""
+        WITH outcomes AS (
+            SELECT e.downstream_job_id AS job_id,
+                   COUNT(*) FILTER (WHERE f.status = %s) AS completed,
+                   COUNT(*) FILTER (WHERE f.status = %s) AS failed
+            FROM unnest(%s::varchar[], %s::varchar[]) AS f(job_id, status)
+            JOIN job_edges e ON e.upstream_job_id = f.job_id
+            GROUP BY e.downstream_job_id
+        )
+        UPDATE jobs j
+        SET children_completed = j.children_completed + o.completed,
+            children_failed = j.children_failed + o.failed
+        FROM outcomes o
+        WHERE j.job_id = o.job_id
+        RETURNING j.job_id
+    """, (STATUS_COMPLETED, STATUS_FAILED, job_ids, statuses))
+
+    downstream_ids = [row[0] for row in cursor.fetchall()]
+    if not downstream_ids:
+        return
+
+    cursor.execute("""
+        UPDATE jobs
+        SET status = CASE WHEN children_failed = children_total THEN %s ELSE %s END,
+            completed_at = %s
+        WHERE job_id = ANY(%s)
+          AND status = %s
+          AND children_completed + children_failed >= children_total
+    """, (
+        STATUS_FAILED, STATUS_COMPLETED,
+        datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
+        downstream_ids,
+        STATUS_BATCH,
+    ))
+
+
+def update_job_status(job_id, status, started_at=None, completed_at=None, claimed_by=None):
+    """
+    Set a job's status (and start/completion time).
+    With `claimed_by`, the update only applies while that node still owns
+    the job, so a worker whose lease was reaped cannot overwrite the result
+    of the node that re-ran it. Returns True if the row was updated.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+
+    assignments = ["status=%s"]
+    params = [status]
+    if started_at:
+        assignments.append("started_at=%s")
+        params.append(started_at)
+    elif completed_at:
+        assignments.append("completed_at=%s")
+        params.append(completed_at)
+
+    if status != STATUS_IN_PROGRESS:
+        # The job no longer runs, so it no longer holds a lease
+        assignments.append("lease_expires_at=NULL")
+
+    conditions = ["job_id=%s"]
+    params.append(job_id)
+    if claimed_by:
+        conditions.append("claimed_by=%s AND status=%s")
+        params += [claimed_by, STATUS_IN_PROGRESS]
+
+    finishing = status in (STATUS_COMPLETED, STATUS_FAILED)
+    if finishing:
+        # A job finishes once; this keeps downstream counters exact
+        conditions.append("status NOT IN (%s, %s)")
+        params += [STATUS_COMPLETED, STATUS_FAILED]
+
+    try:
+        cursor.execute(
+            f"UPDATE jobs SET {', '.join(assignments)} WHERE {' AND '.join(conditions)}",
+            params
+        )
+
+        updated = cursor.rowcount == 1
+        if updated and finishing:
+            _record_finished_jobs(conn, [(job_id, status)])
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        raise
+    finally:
+        return_db_connection(conn)
+
+    return updated
+
 
+def renew_job_lease(job_id):
+    """
+    Heartbeat: push the lease of a running job LEASE_SECONDS into the future.
+    Returns False if this node no longer owns the job (e.g. it was reaped).
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("""
+            UPDATE jobs
+            SET lease_expires_at = NOW() + %s * INTERVAL '1 second'
+            WHERE job_id = %s AND status = %s AND claimed_by = %s
+        """, (LEASE_SECONDS, job_id, STATUS_IN_PROGRESS, NODE_ID))
+
+        renewed = cursor.rowcount == 1
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        raise
+    finally:
+        return_db_connection(conn)
+
+    return renewed
+
+
+def release_job(job_id):
+    """
+    Put a job this node claimed back in the queue without counting the
+    attempt, for failures that are not the job's fault (e.g. no healthy
+    GPU backend). Returns True if this node still owned the job.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("""
+            UPDATE jobs
+            SET status = %s, started_at = NULL, lease_expires_at = NULL,
+                claimed_by = NULL, attempts = GREATEST(attempts - 1, 0)
+            WHERE job_id = %s AND status = %s AND claimed_by = %s
+        """, (STATUS_QUEUED, job_id, STATUS_IN_PROGRESS, NODE_ID))
+
+        released = cursor.rowcount == 1
+        if released:
+            notify_job_queued(cursor, job_id)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        raise
+    finally:
+        return_db_connection(conn)
+
+    return released
+
+
+def requeue_expired_jobs():
+    """
+    Recover IN_PROGRESS jobs whose worker stopped heartbeating.
+    Jobs with attempts left go back to QUEUED, the others are FAILED.
+    Only one node reaps at a time (transaction-scoped advisory lock);
+    the others return an empty list.
+    Returns the list of (job_id, new_status) that were changed.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+    try:
+        cursor.execute("SELECT pg_try_advisory_xact_lock(%s)", (REAPER_LOCK_KEY,))
+        if not cursor.fetchone()[0]:
+            conn.rollback()
+            return []
+
+        cursor.execute("""
+            UPDATE jobs
+            SET status = CASE WHEN attempts < %s THEN %s ELSE %s END,
+                started_at = CASE WHEN attempts < %s THEN NULL ELSE started_at END,
+                completed_at = CASE WHEN attempts < %s THEN NULL ELSE %s END,
+                lease_expires_at = NULL,
+                claimed_by = NULL
+            WHERE status = %s AND lease_expires_at < NOW()
+            RETURNING job_id, status
+        """, (
+            MAX_ATTEMPTS, STATUS_QUEUED, STATUS_FAILED,
+            MAX_ATTEMPTS,
+            MAX_ATTEMPTS, now,
+            STATUS_IN_PROGRESS,
+        ))
+
+        rows = cursor.fetchall()
+        _record_finished_jobs(conn, [(row[0], row[1]) for row in rows if row[1] == STATUS_FAILED])
         conn.commit()
     except Exception as e:
         conn.rollback()
@@ -59,6 +402,8 @@ def update_job_status(job_id, status, started_at=None, completed_at=None):
     finally:
         return_db_connection(conn)
 
+    return [(row[0], row[1]) for row in rows]
+
 
 def has_in_progress_job():
     conn = get_db_connection()
@@ -112,3 +457,51 @@ def get_job_by_id(job_id: str):
         result = None
     return_db_connection(conn)
     return result
+
+
+def get_job_statuses(job_ids):
+    """Map each existing job_id in `job_ids` to its status (missing ids are left out)."""
+    if not job_ids:
+        return {}
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(
+            "SELECT job_id, status FROM jobs WHERE job_id = ANY(%s)",
+            (list(job_ids),)
+        )
+        rows = cursor.fetchall()
+    finally:
+        return_db_connection(conn)
+
+    return {job_id: status for job_id, status in rows}
+
+
+def get_batch(batch_id: str):
+    """
+    A batch parent and its children in one query.
+    Returns {"batch": parent_row, "jobs": [child_rows]}, or None if
+    batch_id is not a batch parent (ordinary jobs have no children).
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+
+    try:
+        cursor.execute("""
+            SELECT * FROM jobs
+            WHERE (job_id = %s AND children_total > 0) OR parent_job_id = %s
+            ORDER BY parent_job_id IS NOT NULL, created_at ASC, job_id ASC
+        """, (batch_id, batch_id))
+        rows = cursor.fetchall()
+    finally:
+        return_db_connection(conn)
+
+    if not rows or rows[0]["job_id"] != batch_id:
+        return None
+
+    return {
+        "batch": {k: v for k, v in rows[0].items()},
+        "jobs": [{k: v for k, v in row.items()} for row in rows[1:]],
+    }
@@ -0,0 +1,120 @@
+# services/job_submission.py
+#
+# In-process job submission. Routers (and features that fan out to other
+# features) call these helpers directly to enqueue a job against files that
+# are already stored, instead of POSTing the media back to our own API.
+
+import os
+import uuid
+from datetime import datetime
+
+from fastapi import HTTPException
+
+from db import get_db_connection, return_db_connection
+from services.job_repository import STATUS_QUEUED, DEFAULT_FEATURE, notify_job_queued
+
+UPLOAD_DIR = "storage/uploads"
+OUTPUT_DIR = "storage/outputs"
+
+
+def new_job_id() -> str:
+    return str(uuid.uuid4())
+
+
+def job_upload_dir(job_id: str) -> str:
+    """storage/uploads/<job_id>, created if needed."""
+    job_dir = os.path.join(UPLOAD_DIR, job_id)
+    os.makedirs(job_dir, exist_ok=True)
+    return job_dir
+
+
+def resolve_user_id(user_id: str) -> int:
+    """
+    Resolve the user_id passed by internal callers: an integer id as-is,
+    otherwise a username or email looked up in the users table.
+    """
+    try:
+        return int(user_id)
+    except ValueError:
+        pass
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT user_id FROM users WHERE username = %s OR email = %s", (user_id, user_id))
+        user_row = cursor.fetchone()
+    finally:
+        return_db_connection(conn)
+
+    if not user_row:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user_row[0]
+
+
+def enqueue_job(job_id: str, user_id_int: int, input_video: str, input_audio: str,
+                feature: str = DEFAULT_FEATURE, output_video: str = None,
+                input_text: str = None, voice: str = None,
+                input_video_sha256: str = None, input_audio_sha256: str = None) -> dict:
+    """
+    Insert a QUEUED job for files already stored on disk and wake the
+    scheduler. Returns the job summary sent back to clients.
+    With `input_text`, `input_audio` is where the worker will write the
+    speech for that text (see services/tts_stage.py).
+    The *_sha256 arguments are the digests returned by ingest_upload.
+    """
+    created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    if output_video is None:
+        output_video = os.path.join(OUTPUT_DIR, f"{job_id}.mp4")
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("""
+            INSERT INTO jobs (
+                job_id,
+                user_id,
+                input_video,
+                input_audio,
+                output_video,
+                status,
+                feature,
+                created_at,
+                started_at,
+                completed_at,
+                input_text,
+                voice,
+                input_video_sha256,
+                input_audio_sha256
+            )
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, (
+            job_id,
+            user_id_int,
+            input_video,
+            input_audio,
+            output_video,
+            STATUS_QUEUED,
+            feature,
+            created_at,
+            None,
+            None,
+            input_text,
+            voice,
+            input_video_sha256,
+            input_audio_sha256
+        ))
+        notify_job_queued(cursor, job_id)
+
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        raise
+    finally:
+        return_db_connection(conn)
+
+    return {
+        "job_id": job_id,
+        "status": STATUS_QUEUED,
+        "feature": feature,
+    }
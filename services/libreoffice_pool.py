@@ -0,0 +1,258 @@
+# services/libreoffice_pool.py
+#
+# Warm pool of headless LibreOffice instances for PPT -> PDF conversion.
+#
+# Starting soffice takes seconds, and two soffice processes sharing the
+# default user profile block or crash each other. Each pool slot owns an
+# isolated profile (storage/cache/libreoffice/slot-<n>) and, when the
+# Python UNO bridge ("uno", shipped with LibreOffice's python3-uno package)
+# is importable, a long-lived soffice listening on its own local port:
+# conversions are sent to the already running instance.
+# Without UNO, each conversion runs `soffice --convert-to pdf` in the
+# slot's own profile: no warm start, but parallel jobs no longer clash.
+#
+# A conversion that exceeds LIBREOFFICE_TIMEOUT kills and restarts the
+# instance. A health thread restarts instances that died or stopped
+# answering while idle.
+
+import os
+import time
+import queue
+import shutil
+import threading
+import subprocess
+
+from services.cpu_pool import cpu_slot
+
+try:
+    import uno
+    from com.sun.star.beans import PropertyValue
+except ImportError:
+    uno = None
+
+LIBREOFFICE_INSTANCES = int(os.getenv("LIBREOFFICE_INSTANCES", "2"))
+LIBREOFFICE_BASE_PORT = int(os.getenv("LIBREOFFICE_BASE_PORT", "2002"))
+LIBREOFFICE_TIMEOUT = float(os.getenv("LIBREOFFICE_TIMEOUT", "120"))  # seconds per conversion
+LIBREOFFICE_START_TIMEOUT = 30  # seconds for a new instance to accept connections
+LIBREOFFICE_HEALTH_INTERVAL = float(os.getenv("LIBREOFFICE_HEALTH_INTERVAL", "30"))  # seconds
+LIBREOFFICE_PROFILE_DIR = "storage/cache/libreoffice"
+SOFFICE = os.getenv("SOFFICE_PATH", "soffice")
+
+
+class ConversionError(RuntimeError):
+    """The document could not be converted (or the instance hung)."""
+
+
+def _property(name, value):
+    prop = PropertyValue()
+    prop.Name = name
+    prop.Value = value
+    return prop
+
+
+class OfficeInstance:
+    """One pool slot: an isolated profile, plus a warm soffice when UNO is available."""
+
+    def __init__(self, slot: int):
+        self.slot = slot
+        self.port = LIBREOFFICE_BASE_PORT + slot
+        self.profile_dir = os.path.abspath(os.path.join(LIBREOFFICE_PROFILE_DIR, f"slot-{slot}"))
+        self.profile_url = "file://" + self.profile_dir
+        self.process = None
+        self.desktop = None
+
+    # -------- warm (UNO) mode --------
+
+    def start(self):
+        """Launch soffice for this slot and connect to it (UNO mode only)."""
+        if uno is None:
+            return
+        self.stop()
+        os.makedirs(self.profile_dir, exist_ok=True)
+        self.process = subprocess.Popen(
+            [
+                SOFFICE, "--headless", "--invisible", "--nologo", "--norestore", "--nodefault",
+                f"-env:UserInstallation={self.profile_url}",
+                f"--accept=socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext",
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+        local_context = uno.getComponentContext()
+        resolver = local_context.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local_context
+        )
+        deadline = time.monotonic() + LIBREOFFICE_START_TIMEOUT
+        while True:
+            try:
+                context = resolver.resolve(
+                    f"uno:socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext"
+                )
+                break
+            except Exception:
+                if self.process.poll() is not None or time.monotonic() > deadline:
+                    self.stop()
+                    raise ConversionError(f"LibreOffice slot {self.slot} did not start")
+                time.sleep(0.25)
+
+        self.desktop = context.ServiceManager.createInstanceWithContext(
+            "com.sun.star.frame.Desktop", context
+        )
+        print(f"🟢 LibreOffice slot {self.slot} ready (port {self.port})")
+
+    def stop(self):
+        self.desktop = None
+        if self.process is not None and self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+        self.process = None
+
+    def healthy(self) -> bool:
+        if uno is None:
+            return True
+        if self.process is None or self.process.poll() is not None or self.desktop is None:
+            return False
+        try:
+            self.desktop.getComponents()
+            return True
+        except Exception:
+            return False
+
+    def _convert_uno(self, src_path: str, pdf_path: str):
+        document = self.desktop.loadComponentFromURL(
+            uno.systemPathToFileUrl(os.path.abspath(src_path)),
+            "_blank",
+            0,
+            (_property("Hidden", True), _property("ReadOnly", True)),
+        )
+        if document is None:
+            raise ConversionError(f"LibreOffice could not open {src_path}")
+        try:
+            document.storeToURL(
+                uno.systemPathToFileUrl(os.path.abspath(pdf_path)),
+                (_property("FilterName", "impress_pdf_Export"),),
+            )
+        finally:
+            document.close(True)
+
+    # -------- conversion --------
+
+    def convert(self, src_path: str, output_dir: str) -> str:
+        """Convert src_path to <output_dir>/<name>.pdf; returns the PDF path."""
+        pdf_path = os.path.join(output_dir, os.path.splitext(os.path.basename(src_path))[0] + ".pdf")
+
+        if uno is None:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            try:
+                subprocess.run(
+                    [
+                        SOFFICE, "--headless", "--norestore",
+                        f"-env:UserInstallation={self.profile_url}",
+                        "--convert-to", "pdf", src_path, "--outdir", output_dir,
+                    ],
+                    check=True,
+                    timeout=LIBREOFFICE_TIMEOUT,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                )
+            except subprocess.TimeoutExpired:
+                raise ConversionError(f"LibreOffice timed out after {LIBREOFFICE_TIMEOUT}s on {src_path}")
+            return pdf_path
+
+        if not self.healthy():
+            self.start()
+
+        # The UNO call cannot be interrupted; run it aside and kill the
+        # instance if it hangs, which makes the call fail and frees us
+        result = {}
+
+        def run():
+            try:
+                self._convert_uno(src_path, pdf_path)
+            except Exception as exc:
+                result["error"] = exc
+
+        worker = threading.Thread(target=run, name=f"soffice-{self.slot}", daemon=True)
+        worker.start()
+        worker.join(LIBREOFFICE_TIMEOUT)
+        if worker.is_alive():
+            print(f"⚠️ LibreOffice slot {self.slot} hung on {src_path}; restarting it")
+            self.stop()
+            raise ConversionError(f"LibreOffice timed out after {LIBREOFFICE_TIMEOUT}s on {src_path}")
+        if "error" in result:
+            # The instance may be in a bad state; start fresh next time
+            if not self.healthy():
+                self.stop()
+            raise ConversionError(f"LibreOffice failed on {src_path}: {result['error']}")
+        return pdf_path
+
+
+class OfficePool:
+    """Fixed set of OfficeInstance slots handed out one conversion at a time."""
+
+    def __init__(self, size: int):
+        self.instances = [OfficeInstance(slot) for slot in range(size)]
+        self.idle = queue.Queue()
+        for instance in self.instances:
+            self.idle.put(instance)
+
+    def convert_to_pdf(self, src_path: str, output_dir: str) -> str:
+        instance = self.idle.get()
+        try:
+            with cpu_slot():
+                return instance.convert(src_path, output_dir)
+        finally:
+            self.idle.put(instance)
+
+    def check_health(self):
+        """Restart idle instances that died or stopped answering."""
+        if uno is None:
+            return
+        for _ in range(len(self.instances)):
+            try:
+                instance = self.idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                if not instance.healthy():
+                    print(f"⚠️ LibreOffice slot {instance.slot} unhealthy; restarting")
+                    instance.start()
+            except Exception as exc:
+                print(f"🔴 LibreOffice slot {instance.slot} restart failed → {exc}")
+            finally:
+                self.idle.put(instance)
+
+    def start_health_checks(self):
+        def loop():
+            # The first pass starts (warms) every instance
+            while True:
+                try:
+                    self.check_health()
+                except Exception as exc:
+                    print(f"🔴 LibreOffice health check failed → {exc}")
+                time.sleep(LIBREOFFICE_HEALTH_INTERVAL)
+
+        threading.Thread(target=loop, name="libreoffice-health", daemon=True).start()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_office_pool() -> OfficePool:
+    """Process-wide pool, created (and warmed in the background) on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            if shutil.which(SOFFICE) is None:
+                print(f"⚠️ {SOFFICE} not found on PATH; PPT conversion will fail")
+            _pool = OfficePool(LIBREOFFICE_INSTANCES)
+            print(f"🟢 LibreOffice pool: {LIBREOFFICE_INSTANCES} slots ({'warm UNO' if uno else 'subprocess'} mode)")
+            _pool.start_health_checks()
+        return _pool
+
+
+def convert_to_pdf(src_path: str, output_dir: str) -> str:
+    """Convert a presentation to PDF on a pooled LibreOffice slot."""
+    return get_office_pool().convert_to_pdf(src_path, output_dir)
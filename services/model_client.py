@@ -1,19 +1,30 @@
 # services/model_client.py
 
-import requests
+from services.http_client import get_session
+from services.gpu_pool import get_gpu_pool
+from services.resilience import get_policy, check_response, is_retryable_submission
+from services.multipart_stream import MultipartFileStream
 
-MODEL_ENDPOINT = "http://154.201.127.0:7001/generate"
+
+def _post_to_model(input_video: str, input_audio: str):
+    body = MultipartFileStream({
+        "media": ("input.mp4", input_video, "video/mp4"),
+        "audio": ("input.wav", input_audio, "audio/wav")
+    })
+    with get_gpu_pool().acquire() as backend:
+        response = get_session().post(
+            backend.generate_endpoint,
+            data=body,
+            headers={"Content-Type": body.content_type}
+        )
+        check_response(response)
+    return response
 
 
 def call_lipsync_model(input_video: str, input_audio: str):
-    with open(input_video, "rb") as v, open(input_audio, "rb") as a:
-        response = requests.post(
-            MODEL_ENDPOINT,
-            files={
-                "media": ("input.mp4", v, "video/mp4"),
-                "audio": ("input.wav", a, "audio/wav")
-            }
-        )
+    response = get_policy("gpu-generate", use_breaker=False, retryable=is_retryable_submission).call(
+        lambda: _post_to_model(input_video, input_audio)
+    )
 
     print("====== MODEL RESPONSE DEBUG ======")
     print("Status Code:", response.status_code)
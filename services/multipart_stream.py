@@ -0,0 +1,83 @@
+# services/multipart_stream.py
+#
+# Streaming multipart/form-data body for uploading large media files.
+# requests builds `files=` bodies fully in memory; this encoder instead
+# reads each file from disk in chunks while the body is being sent, so
+# memory stays bounded by the chunk size. Files are opened only while
+# they are being sent and closed right after. The body has a known
+# length (sent as Content-Length) and can be iterated again, so
+# retries resend it from the start.
+#
+#   body = MultipartFileStream({"media": ("face.mp4", path, "video/mp4")})
+#   session.post(url, data=body, headers={"Content-Type": body.content_type})
+
+import os
+import uuid
+
+STREAM_CHUNK_SIZE = 1024 * 1024  # 1 MB
+
+
+class MultipartFileStream:
+    def __init__(self, files: dict, chunk_size: int = STREAM_CHUNK_SIZE, progress=None):
+        """
+        files: {field_name: (filename, path, content_type)}
+        progress: optional callable(bytes_sent, total_bytes), called per chunk
+        """
+        self.files = files
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+
+    def _part_header(self, field: str, filename: str, content_type: str) -> bytes:
+        return (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode()
+
+    def _closing(self) -> bytes:
+        return f"--{self.boundary}--\r\n".encode()
+
+    def __len__(self) -> int:
+        total = len(self._closing())
+        for field, (filename, path, content_type) in self.files.items():
+            total += len(self._part_header(field, filename, content_type))
+            total += os.path.getsize(path) + 2  # trailing CRLF
+        return total
+
+    def __iter__(self):
+        total = len(self)
+        sent = 0
+        for field, (filename, path, content_type) in self.files.items():
+            header = self._part_header(field, filename, content_type)
+            sent += len(header)
+            yield header
+
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(self.chunk_size), b""):
+                    sent += len(chunk)
+                    yield chunk
+                    if self.progress:
+                        self.progress(sent, total)
+
+            sent += 2
+            yield b"\r\n"
+
+        yield self._closing()
+        if self.progress:
+            self.progress(total, total)
+
+
+def progress_logger(log, label: str, step_percent: int = 25):
+    """Progress callback that logs `label` every `step_percent` percent."""
+    state = {"next": step_percent}
+
+    def report(sent: int, total: int):
+        percent = sent * 100 // total if total else 100
+        if percent >= state["next"]:
+            log(f"{label}: uploaded {percent}% ({sent // (1024 * 1024)} / {total // (1024 * 1024)} MB)")
+            while state["next"] <= percent:
+                state["next"] += step_percent
+
+    return report
@@ -0,0 +1,296 @@
+# services/resilience.py
+#
+# Retry + circuit breaker helpers shared by the outbound API calls in services/.
+#
+#   policy = get_policy("groq")
+#   response = policy.call(lambda: session.post(...))
+#
+# - Retries use full-jitter exponential backoff and only fire for transient
+#   errors (network failures, 429/502/503/504).
+# - A retry budget caps retries to a fraction of calls, so a dependency that
+#   is down is not hammered with retry storms.
+# - A circuit breaker opens after repeated failures and rejects calls at once
+#   (CircuitOpenError) until the reset timeout lets a trial call through.
+
+import os
+import time
+import random
+import threading
+
+import requests
+import urllib3
+
+RETRYABLE_STATUS = (429, 502, 503, 504)
+
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "1"))  # seconds
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "30"))  # seconds
+# Retries allowed per call made (plus a small floor), per dependency
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))
+RETRY_BUDGET_MIN = 10
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))  # seconds
+
+
+class RetryableHTTPError(requests.exceptions.HTTPError):
+    """HTTP response with a transient status code (see RETRYABLE_STATUS)."""
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a dependency whose breaker is open."""
+
+
+class NotAttemptedError(RuntimeError):
+    """
+    Raised by a call before it reached the dependency (e.g. no local rate
+    limiter slot in time). Not retried and not recorded on the breaker:
+    the dependency did nothing wrong.
+    """
+
+
+def check_response(response):
+    """Raise RetryableHTTPError if the response has a transient status."""
+    if response.status_code in RETRYABLE_STATUS:
+        raise RetryableHTTPError(
+            f"{response.status_code} from {response.url}: {response.text[:200]}",
+            response=response,
+        )
+    return response
+
+
+def is_retryable(exc: Exception) -> bool:
+    """True for errors worth retrying: network failures and transient statuses."""
+    if isinstance(exc, CircuitOpenError):
+        return False
+    if isinstance(exc, (RetryableHTTPError, requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    # SDK clients (e.g. Sarvam, built on httpx) expose the HTTP status
+    if getattr(exc, "status_code", None) in RETRYABLE_STATUS:
+        return True
+    # Library errors wrapping a network error (e.g. gTTSError from requests)
+    if exc.__cause__ is not None:
+        return is_retryable(exc.__cause__)
+    try:
+        import httpx
+        if isinstance(exc, httpx.TransportError):
+            return True
+    except ImportError:
+        pass
+    try:
+        # edge-tts talks to its service over aiohttp
+        import aiohttp
+        return isinstance(exc, aiohttp.ClientConnectionError)
+    except ImportError:
+        return False
+
+
+def is_retryable_submission(exc: Exception) -> bool:
+    """
+    Stricter is_retryable for non-idempotent submissions (e.g. GPU
+    /generate): retry only when the server cannot have started the work,
+    i.e. the connection was never made or a gateway answered 502/503/504.
+    A read timeout may mean the job is still running remotely.
+    """
+    if isinstance(exc, CircuitOpenError):
+        return False
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(exc, requests.exceptions.ConnectionError):
+        # Refused / unreachable, as opposed to a connection dropped mid-request
+        reason = getattr(exc.args[0], "reason", None) if exc.args else None
+        return isinstance(reason, urllib3.exceptions.ConnectTimeoutError)
+    if isinstance(exc, RetryableHTTPError):
+        return exc.response is not None and exc.response.status_code in (502, 503, 504)
+    return isinstance(exc, ConnectionRefusedError)
+
+
+class CircuitBreaker:
+    """
+    closed → open after `failure_threshold` consecutive failures;
+    open → half-open once `reset_timeout` has passed (one trial call);
+    half-open → closed on success, open again on failure.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = BREAKER_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls are being rejected (no trial allowed yet)."""
+        with self.lock:
+            return self.opened_at is not None and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def allow(self) -> bool:
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout or self.trial_in_flight:
+                return False
+            # Half-open: let one trial call through
+            self.trial_in_flight = True
+            return True
+
+    def release_trial(self):
+        with self.lock:
+            self.trial_in_flight = False
+
+    def record_success(self):
+        with self.lock:
+            if self.opened_at is not None:
+                print(f"🟢 Circuit '{self.name}' closed")
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self, error=None):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    print(f"🔴 Circuit '{self.name}' opened → {error}")
+                self.opened_at = time.monotonic()
+
+
+class RetryBudget:
+    """Allows at most `ratio` retries per call, plus a floor of `minimum`."""
+
+    def __init__(self, ratio: float = RETRY_BUDGET_RATIO, minimum: int = RETRY_BUDGET_MIN):
+        self.ratio = ratio
+        self.minimum = minimum
+        self.tokens = float(minimum)
+        self.lock = threading.Lock()
+
+    def record_call(self):
+        with self.lock:
+            self.tokens = min(self.tokens + self.ratio, self.minimum + 100 * self.ratio)
+
+    def try_spend(self) -> bool:
+        with self.lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class RateLimiter:
+    """
+    Token bucket shared by all callers of one rate-limited API:
+    `rate` requests per second with bursts of up to `burst`.
+    pause() stops handing out tokens for a while, e.g. after a 429 with
+    Retry-After, so concurrent workers back off together.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self, timeout: float = None) -> bool:
+        """Wait for a token. Returns False if none is available within `timeout`."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate if self.rate > 0 else 1.0)
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+def backoff_delay(attempt: int, base: float = RETRY_BASE_DELAY, cap: float = RETRY_MAX_DELAY) -> float:
+    """Full-jitter exponential backoff for the given retry attempt (0-based)."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class ResiliencePolicy:
+    """Retry budget + optional circuit breaker for one outbound dependency."""
+
+    def __init__(self, name: str, retries: int = HTTP_RETRIES, use_breaker: bool = True,
+                 retryable=is_retryable):
+        self.name = name
+        self.retries = retries
+        self.retryable = retryable
+        self.breaker = CircuitBreaker(name) if use_breaker else None
+        self.budget = RetryBudget()
+
+    def call(self, fn, retries: int = None):
+        """
+        Call fn() with retries on transient errors.
+        Raises CircuitOpenError without calling fn while the breaker is open.
+        """
+        retries = self.retries if retries is None else retries
+        self.budget.record_call()
+        attempt = 0
+
+        while True:
+            if self.breaker is not None and not self.breaker.allow():
+                raise CircuitOpenError(f"Circuit '{self.name}' is open; not calling it")
+
+            try:
+                result = fn()
+            except NotAttemptedError:
+                if self.breaker is not None:
+                    # Hand back a half-open trial we never used
+                    self.breaker.release_trial()
+                raise
+            except Exception as exc:
+                retryable = self.retryable(exc)
+                if self.breaker is not None:
+                    if retryable:
+                        self.breaker.record_failure(exc)
+                    else:
+                        # The dependency answered; the error is ours or the input's
+                        self.breaker.record_success()
+                if not retryable or attempt >= retries or not self.budget.try_spend():
+                    raise
+
+                delay = backoff_delay(attempt)
+                print(f"⚠️ {self.name} call failed ({exc}); retry {attempt + 1}/{retries} in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            if self.breaker is not None:
+                self.breaker.record_success()
+            return result
+
+
+_policies = {}
+_policies_lock = threading.Lock()
+
+
+def get_policy(name: str, use_breaker: bool = True, retryable=is_retryable) -> ResiliencePolicy:
+    """
+    Process-wide policy for a named dependency (created on first use).
+    Pass retryable=is_retryable_submission for calls that must not run twice.
+    """
+    with _policies_lock:
+        if name not in _policies:
+            _policies[name] = ResiliencePolicy(name, use_breaker=use_breaker, retryable=retryable)
+        return _policies[name]
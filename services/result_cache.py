@@ -0,0 +1,112 @@
+# services/result_cache.py
+#
+# Content-addressed cache of lipsync outputs. A job whose input video,
+# input audio and model version were already rendered gets the existing
+# output hard-linked into storage/outputs instead of a new GPU inference.
+#
+# Entries live in storage/cache/results/<key>.mp4. Entries older than
+# RESULT_CACHE_MAX_AGE_DAYS are dropped, then least recently used ones
+# until the cache fits in RESULT_CACHE_MAX_BYTES. Last use is tracked in
+# the file's atime, set explicitly on every hit.
+
+import os
+import time
+import hashlib
+import threading
+
+from services.blob_store import link_or_copy
+
+RESULT_CACHE_DIR = "storage/cache/results"
+# Bump when the model on the GPU servers changes, so old renders are not reused
+LIPSYNC_MODEL_VERSION = os.getenv("LIPSYNC_MODEL_VERSION", "v1")
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "1") == "1"
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(20 * 1024 ** 3)))
+RESULT_CACHE_MAX_AGE_DAYS = float(os.getenv("RESULT_CACHE_MAX_AGE_DAYS", "30"))
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+_evict_lock = threading.Lock()
+
+
+def hash_file(path: str) -> str:
+    """sha256 of a file, read in 1 MB chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def lipsync_cache_key(video_path: str, audio_path: str,
+                      video_sha256: str = None, audio_sha256: str = None) -> str:
+    """
+    Cache key for a lipsync render of these inputs with the current model.
+    Pass the digests recorded at upload (blob ids) when known; only inputs
+    without one (e.g. audio generated by the TTS stage) are hashed here.
+    """
+    video_sha256 = video_sha256 or hash_file(video_path)
+    audio_sha256 = audio_sha256 or hash_file(audio_path)
+    parts = f"{LIPSYNC_MODEL_VERSION}:{video_sha256}:{audio_sha256}"
+    return hashlib.sha256(parts.encode()).hexdigest()
+
+
+def _entry_path(key: str) -> str:
+    return os.path.join(RESULT_CACHE_DIR, f"{key}.mp4")
+
+
+def lookup(key: str):
+    """Path of the cached output for `key`, or None on a miss."""
+    if not RESULT_CACHE_ENABLED:
+        return None
+
+    path = _entry_path(key)
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    if time.time() - st.st_mtime > RESULT_CACHE_MAX_AGE_DAYS * 86400:
+        return None
+
+    # Record the hit for LRU eviction without touching mtime
+    os.utime(path, (time.time(), st.st_mtime))
+    return path
+
+
+def store(key: str, output_path: str):
+    """Add a finished output to the cache, then evict if over budget."""
+    if not RESULT_CACHE_ENABLED:
+        return
+
+    link_or_copy(output_path, _entry_path(key))
+    evict()
+
+
+def evict():
+    """Drop expired entries, then least recently used ones until under the size budget."""
+    if not os.path.isdir(RESULT_CACHE_DIR):
+        return
+
+    with _evict_lock:
+        now = time.time()
+        entries = []
+        for name in os.listdir(RESULT_CACHE_DIR):
+            if not name.endswith(".mp4"):
+                continue
+            path = os.path.join(RESULT_CACHE_DIR, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if now - st.st_mtime > RESULT_CACHE_MAX_AGE_DAYS * 86400:
+                os.remove(path)
+                continue
+            entries.append((st.st_atime, st.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= RESULT_CACHE_MAX_BYTES:
+                break
+            # Outputs linked from this entry keep their own link
+            os.remove(path)
+            total -= size
@@ -0,0 +1,90 @@
+# services/slide_raster.py
+#
+# Parallel PDF page rasterization for IntelliTutor slides.
+#
+# Pages are rendered straight at the video frame size (SLIDE_WIDTH x
+# SLIDE_HEIGHT, stretched exactly like the old `scale=1280:720` step did),
+# spread over a process pool so large decks use every core. The pool is
+# shared by all jobs, so RASTER_WORKERS also bounds the CPU spent on
+# rendering across the whole scheduler.
+#
+# SLIDE_FRAME_FORMAT=png writes slide_<i>.png (default). "raw" writes
+# slide_<i>.rgb (packed RGB24, no PNG encoding); compose_video feeds those
+# straight into ffmpeg as rawvideo. This module is imported by the pool's
+# worker processes, so it keeps its imports light.
+
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from services.cpu_pool import CPU_WORKERS
+
+SLIDE_WIDTH = 1280
+SLIDE_HEIGHT = 720
+RASTER_WORKERS = int(os.getenv("RASTER_WORKERS", str(CPU_WORKERS)))
+SLIDE_FRAME_FORMAT = os.getenv("SLIDE_FRAME_FORMAT", "png").lower()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the scheduler process runs many threads
+            _pool = ProcessPoolExecutor(
+                max_workers=RASTER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def _render_pages(pdf_path: str, page_numbers, output_dir: str, frame_format: str):
+    """Worker: render the given pages at SLIDE_WIDTH x SLIDE_HEIGHT."""
+    import fitz
+
+    paths = []
+    with fitz.open(pdf_path) as doc:
+        for i in page_numbers:
+            page = doc.load_page(i)
+            rect = page.rect
+            matrix = fitz.Matrix(SLIDE_WIDTH / rect.width, SLIDE_HEIGHT / rect.height)
+            pix = page.get_pixmap(matrix=matrix, alpha=False)
+            if (pix.width, pix.height) != (SLIDE_WIDTH, SLIDE_HEIGHT):
+                # Rounding of odd page sizes; resample to the exact frame size
+                pix = fitz.Pixmap(pix, SLIDE_WIDTH, SLIDE_HEIGHT, None)
+
+            if frame_format == "raw":
+                path = os.path.join(output_dir, f"slide_{i}.rgb")
+                with open(path, "wb") as f:
+                    f.write(pix.samples)
+            else:
+                path = os.path.join(output_dir, f"slide_{i}.png")
+                pix.save(path)
+            paths.append((i, path))
+    return paths
+
+
+def rasterize_pdf(pdf_path: str, output_dir: str, page_count: int, frame_format: str = None):
+    """
+    Render every page of pdf_path into output_dir, in parallel.
+    Returns the frame paths in page order.
+    """
+    frame_format = frame_format or SLIDE_FRAME_FORMAT
+    if page_count == 0:
+        return []
+
+    # Interleaved chunks: each worker opens the PDF once and neighbouring
+    # (similarly heavy) pages are spread across workers
+    chunks = min(RASTER_WORKERS, page_count)
+    futures = [
+        _get_pool().submit(_render_pages, pdf_path, list(range(k, page_count, chunks)), output_dir, frame_format)
+        for k in range(chunks)
+    ]
+
+    frames = {}
+    for future in futures:
+        frames.update(future.result())
+    return [frames[i] for i in range(page_count)]
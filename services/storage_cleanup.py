@@ -0,0 +1,60 @@
+# services/storage_cleanup.py
+#
+# Frees upload storage once jobs are done with it. A worker removes its
+# job's storage/uploads/<job_id> directory as soon as the job is finished;
+# the scheduler's periodic sweep catches everything else (jobs failed by the
+# lease reaper, finished batches, whose children all read from the parent's
+# directory, and directories left by uploads that never became a job), then
+# runs blob_store.gc() to drop the blobs nothing links to anymore.
+
+import os
+import time
+import shutil
+
+from services import blob_store
+from services.job_repository import get_job_statuses, STATUS_COMPLETED, STATUS_FAILED
+
+UPLOAD_DIR = "storage/uploads"
+# Seconds between sweeps
+STORAGE_SWEEP_INTERVAL = int(os.getenv("STORAGE_SWEEP_INTERVAL", "3600"))
+# A directory with no job row is only removed once it is this old
+# (an upload may still be in flight, its job not inserted yet)
+ORPHAN_GRACE_SECONDS = blob_store.BLOB_GC_GRACE_SECONDS
+
+
+def remove_job_uploads(job_id: str):
+    """Delete storage/uploads/<job_id> (no-op if it does not exist)."""
+    shutil.rmtree(os.path.join(UPLOAD_DIR, job_id), ignore_errors=True)
+
+
+def sweep_uploads():
+    """
+    Remove the upload directories of finished or unknown jobs, then
+    unreferenced blobs. Returns (directories_removed, blobs_removed).
+    """
+    if not os.path.isdir(UPLOAD_DIR):
+        return 0, blob_store.gc()
+
+    job_ids = [
+        name for name in os.listdir(UPLOAD_DIR)
+        if os.path.isdir(os.path.join(UPLOAD_DIR, name))
+    ]
+    statuses = get_job_statuses(job_ids)
+
+    removed = 0
+    now = time.time()
+    for job_id in job_ids:
+        status = statuses.get(job_id)
+        if status is None:
+            try:
+                age = now - os.stat(os.path.join(UPLOAD_DIR, job_id)).st_mtime
+            except FileNotFoundError:
+                continue
+            if age < ORPHAN_GRACE_SECONDS:
+                continue
+        elif status not in (STATUS_COMPLETED, STATUS_FAILED):
+            continue
+        remove_job_uploads(job_id)
+        removed += 1
+
+    return removed, blob_store.gc()
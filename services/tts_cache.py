@@ -0,0 +1,123 @@
+# services/tts_cache.py
+#
+# Content-addressed cache of generated speech. Feature 3 batches repeat the
+# same script for every name and IntelliTutor decks get re-narrated when
+# resubmitted; identical (text, speaker, language, model) requests reuse
+# the stored WAV instead of calling the TTS API again.
+#
+# Entries live in storage/cache/tts/<key>.wav and are hard-linked into the
+# job directory on a hit. Least recently used entries (atime, set on every
+# hit) are evicted once the cache exceeds TTS_CACHE_MAX_BYTES.
+
+import os
+import re
+import time
+import hashlib
+import threading
+import unicodedata
+
+from services.blob_store import link_or_copy
+
+TTS_CACHE_DIR = "storage/cache/tts"
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "1") == "1"
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+# Bump when the TTS model or its settings change, so old audio is not reused
+TTS_MODEL_VERSION = os.getenv("TTS_MODEL_VERSION", "v1")
+# Eviction scans the whole directory, so run it at most this often
+TTS_CACHE_EVICT_INTERVAL = 60  # seconds
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+_last_evict = 0.0
+
+
+def normalize_text(text: str) -> str:
+    """Unicode NFC with runs of whitespace collapsed; what the speaker hears is unchanged."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+def tts_cache_key(text: str, speaker: str, language: str, model: str = None) -> str:
+    parts = "\0".join([model or TTS_MODEL_VERSION, language, speaker, normalize_text(text)])
+    return hashlib.sha256(parts.encode("utf-8")).hexdigest()
+
+
+def _entry_path(key: str) -> str:
+    return os.path.join(TTS_CACHE_DIR, f"{key}.wav")
+
+
+def _count(name: str):
+    with _lock:
+        _stats[name] += 1
+
+
+def stats() -> dict:
+    """Hit / miss counters of this process, plus the hit ratio."""
+    with _lock:
+        result = dict(_stats)
+    lookups = result["hits"] + result["misses"]
+    result["hit_ratio"] = result["hits"] / lookups if lookups else 0.0
+    return result
+
+
+def fetch(key: str, dest_path: str) -> bool:
+    """Link the cached WAV for `key` to dest_path. Returns True on a hit."""
+    if not TTS_CACHE_ENABLED:
+        return False
+
+    path = _entry_path(key)
+    try:
+        st = os.stat(path)
+        link_or_copy(path, dest_path)
+    except FileNotFoundError:
+        _count("misses")
+        return False
+
+    # Record the hit for LRU eviction
+    os.utime(path, (time.time(), st.st_mtime))
+    _count("hits")
+    return True
+
+
+def store(key: str, wav_path: str):
+    """Add freshly generated audio to the cache, evicting if over budget."""
+    if not TTS_CACHE_ENABLED:
+        return
+
+    link_or_copy(wav_path, _entry_path(key))
+    _count("stores")
+
+    global _last_evict
+    with _lock:
+        due = time.time() - _last_evict >= TTS_CACHE_EVICT_INTERVAL
+        if due:
+            _last_evict = time.time()
+    if due:
+        evict()
+
+
+def evict():
+    """Drop least recently used entries until the cache fits in TTS_CACHE_MAX_BYTES."""
+    if not os.path.isdir(TTS_CACHE_DIR):
+        return
+
+    entries = []
+    for name in os.listdir(TTS_CACHE_DIR):
+        if not name.endswith(".wav"):
+            continue
+        path = os.path.join(TTS_CACHE_DIR, name)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((st.st_atime, st.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= TTS_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        _count("evictions")
@@ -1,42 +1,51 @@
 # services/tts_client.py
 
-import base64
 import os
-from sarvamai import SarvamAI
 from dotenv import load_dotenv
 
-load_dotenv()
-
-SARVAM_API_KEY = os.getenv("SARVAM_API_KEY")
+from services import tts_cache
+from services import tts_providers
 
-if not SARVAM_API_KEY:
-    raise RuntimeError("SARVAM_API_KEY missing")
-
-sarvam_client = SarvamAI(api_subscription_key=SARVAM_API_KEY)
+load_dotenv()
 
 
-def generate_audio(text: str, voice: str, output_path: str):
+def generate_audio(text: str, voice: str, output_path: str, language: str = "en-IN"):
     """
-    Generates REAL Sarvam TTS audio and saves it as WAV
-    voice: hitesh / manisha
+    Generates TTS audio and saves it as WAV
+    voice: hitesh / manisha (Sarvam speakers; other providers map them)
+    The provider is picked by services/tts_providers.py (TTS_PROVIDERS
+    order, Sarvam first by default, unless it is slow or failing).
+    Identical requests are served from the TTS cache (services/tts_cache.py).
+    Cache entries are per provider, and a provider's entry is only looked
+    up when the router gets to that provider, so a fallback voice cached
+    earlier never replaces a preferred provider that can still answer.
     """
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    hits = []
 
-    # Sarvam voice selection is implicit by language + model
-    # (Sarvam does not expose voice param directly like ElevenLabs)
-    tts = sarvam_client.text_to_speech.convert(
-        text=text,
-        target_language_code="en-IN",
-        speaker=voice
-    )
+    def from_cache(provider):
+        key = tts_cache.tts_cache_key(text, voice, language, _cache_model(provider.name))
+        if tts_cache.fetch(key, output_path):
+            hits.append(provider.name)
+            return True
+        return False
 
-    # Sarvam returns base64 audio
-    audio_bytes = base64.b64decode(tts.audios[0])
+    used = tts_providers.synthesize(text, voice, output_path, language=language, cached=from_cache)
 
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    if hits:
+        print(f"🟢 TTS cache hit via {used} ({voice}) → {output_path} {tts_cache.stats()}")
+        return output_path
 
-    with open(output_path, "wb") as f:
-        f.write(audio_bytes)
+    print(f"🟢 TTS generated via {used} ({voice}) → {output_path}")
 
-    print(f"🟢 Sarvam TTS generated ({voice}) → {output_path}")
+    try:
+        tts_cache.store(tts_cache.tts_cache_key(text, voice, language, _cache_model(used)), output_path)
+    except OSError as e:
+        # The cache is an optimization only; the audio is already in place
+        print(f"⚠️ TTS cache store failed: {e}")
 
     return output_path
+
+
+def _cache_model(provider_name: str) -> str:
+    return f"{tts_cache.TTS_MODEL_VERSION}:{provider_name}"
@@ -0,0 +1,396 @@
+# services/tts_providers.py
+#
+# Pluggable TTS providers behind one routing layer.
+#
+# Providers: "sarvam" (Sarvam AI), "edge" (edge-tts), "gtts" (Google
+# Translate TTS) and "stub" (deterministic local tone, for offline tests and
+# benchmarks). TTS_PROVIDERS lists the ones to use, in preference order.
+#
+# Every call records the provider's latency and outcome. The router tries
+# providers in preference order, so one voice narrates a job as long as
+# its provider is healthy; a provider that is recently slow
+# (TTS_SLOW_SECONDS) or failing (TTS_MAX_ERROR_RATE) is moved behind the
+# others until its stats go stale (TTS_STATS_TTL) and it gets another
+# chance. Providers that cannot honour the requested speaker (gTTS) are
+# only a last resort. On error the router fails over to the next one.
+# Each provider has a circuit breaker, so one that keeps failing is
+# skipped until its breaker lets a trial call through again.
+# With TTS_HEDGE_AFTER > 0, a call still running after that many seconds is
+# raced against the next provider and the first result wins.
+# Calls in flight per provider are capped (TTS_PROVIDER_CONCURRENCY), so
+# callers can fan out freely (e.g. one request per slide) without
+# exceeding a provider's rate limits.
+
+import os
+import math
+import time
+import wave
+import struct
+import asyncio
+import hashlib
+import threading
+import subprocess
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from services.resilience import get_policy, CircuitBreaker
+from services.cpu_pool import cpu_slot
+
+TTS_PROVIDERS = [
+    name.strip()
+    for name in os.getenv("TTS_PROVIDERS", "sarvam,edge,gtts").split(",")
+    if name.strip()
+]
+# Routing: "adaptive" (preference order, slow / failing providers moved
+# back) or "ordered" (TTS_PROVIDERS order, failing over only on errors)
+TTS_ROUTING = os.getenv("TTS_ROUTING", "adaptive").lower()
+# A provider whose average latency exceeds this is moved back (seconds)
+TTS_SLOW_SECONDS = float(os.getenv("TTS_SLOW_SECONDS", "20"))
+# ... as is one whose recent error rate reaches this (0..1)
+TTS_MAX_ERROR_RATE = float(os.getenv("TTS_MAX_ERROR_RATE", "0.5"))
+# Stats older than this no longer demote a provider (seconds)
+TTS_STATS_TTL = float(os.getenv("TTS_STATS_TTL", "120"))
+# Seconds before a hedged request is sent to the next provider (0 = off)
+TTS_HEDGE_AFTER = float(os.getenv("TTS_HEDGE_AFTER", "0"))
+# Weight of the newest sample in the latency / error moving averages
+TTS_STATS_ALPHA = 0.2
+# Max concurrent calls per provider, "name=limit,..."; unlisted providers
+# get TTS_PROVIDER_DEFAULT_CONCURRENCY
+TTS_PROVIDER_CONCURRENCY = {
+    name.strip(): int(limit)
+    for name, _, limit in (
+        item.partition("=")
+        for item in os.getenv("TTS_PROVIDER_CONCURRENCY", "sarvam=4,edge=4,gtts=2,stub=16").split(",")
+        if item.strip()
+    )
+}
+TTS_PROVIDER_DEFAULT_CONCURRENCY = int(os.getenv("TTS_PROVIDER_DEFAULT_CONCURRENCY", "4"))
+
+# Voices are named after Sarvam speakers (config/tts_config.py);
+# other providers map them to their closest voice
+EDGE_VOICES = {
+    "manisha": "en-IN-NeerjaNeural",
+    "hitesh": "en-IN-PrabhatNeural",
+}
+
+_hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="tts-hedge")
+
+
+class TTSProvider:
+    """One TTS backend. Subclasses implement synthesize()."""
+
+    name = None
+    # False for providers with one voice per language: the requested
+    # speaker (and its gender) is not honoured, so they are a last resort
+    honours_voice = True
+
+    def __init__(self):
+        self.breaker = CircuitBreaker(f"tts-{self.name}")
+        self.latency = None  # moving average, seconds
+        self.error_rate = 0.0  # moving average, 0..1
+        self.updated_at = None  # time.monotonic() of the last sample
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(
+            TTS_PROVIDER_CONCURRENCY.get(self.name, TTS_PROVIDER_DEFAULT_CONCURRENCY)
+        )
+
+    def available(self) -> bool:
+        """Installed and configured (independent of current health)."""
+        return True
+
+    def synthesize(self, text: str, voice: str, language: str, output_path: str):
+        """Write `text` spoken by `voice` to output_path as WAV."""
+        raise NotImplementedError
+
+    def record(self, elapsed: float, ok: bool):
+        with self.lock:
+            if ok:
+                self.latency = elapsed if self.latency is None else (
+                    TTS_STATS_ALPHA * elapsed + (1 - TTS_STATS_ALPHA) * self.latency
+                )
+            self.error_rate = TTS_STATS_ALPHA * (0.0 if ok else 1.0) + (1 - TTS_STATS_ALPHA) * self.error_rate
+            self.updated_at = time.monotonic()
+
+    def degraded(self) -> bool:
+        """Recently slow or failing (see TTS_SLOW_SECONDS / TTS_MAX_ERROR_RATE)."""
+        with self.lock:
+            if self.updated_at is None or time.monotonic() - self.updated_at > TTS_STATS_TTL:
+                return False
+            slow = self.latency is not None and self.latency > TTS_SLOW_SECONDS
+            return slow or self.error_rate >= TTS_MAX_ERROR_RATE
+
+
+class SarvamProvider(TTSProvider):
+    name = "sarvam"
+
+    def __init__(self):
+        super().__init__()
+        self.client = None
+
+    def available(self) -> bool:
+        return bool(os.getenv("SARVAM_API_KEY")) and importlib.util.find_spec("sarvamai") is not None
+
+    def _get_client(self):
+        # Created on first use, so a missing key only disables this provider
+        with self.lock:
+            if self.client is None:
+                from sarvamai import SarvamAI
+                self.client = SarvamAI(api_subscription_key=os.getenv("SARVAM_API_KEY"))
+            return self.client
+
+    def synthesize(self, text, voice, language, output_path):
+        import base64
+
+        client = self._get_client()
+        # Sarvam voice selection is implicit by language + model
+        # (Sarvam does not expose voice param directly like ElevenLabs)
+        # Transient Sarvam failures are retried by the "sarvam" policy
+        tts = get_policy("sarvam").call(
+            lambda: client.text_to_speech.convert(
+                text=text,
+                target_language_code=language,
+                speaker=voice
+            )
+        )
+
+        # Sarvam returns base64 audio
+        with open(output_path, "wb") as f:
+            f.write(base64.b64decode(tts.audios[0]))
+
+
+def _mp3_to_wav(mp3_path: str, wav_path: str):
+    with cpu_slot():
+        subprocess.run(
+            # Explicit format: callers write to temp names without .wav
+            ["ffmpeg", "-y", "-i", mp3_path, "-f", "wav", wav_path],
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+
+
+class EdgeProvider(TTSProvider):
+    name = "edge"
+
+    def available(self) -> bool:
+        return importlib.util.find_spec("edge_tts") is not None
+
+    def synthesize(self, text, voice, language, output_path):
+        import edge_tts
+
+        mp3_path = f"{output_path}.mp3"
+        edge_voice = EDGE_VOICES.get(voice, voice)
+        try:
+            # Worker threads have no event loop of their own. Transient
+            # failures are retried by the "edge-tts" policy (the provider's
+            # own breaker handles persistent ones)
+            get_policy("edge-tts", use_breaker=False).call(
+                lambda: asyncio.run(edge_tts.Communicate(text, edge_voice).save(mp3_path))
+            )
+            _mp3_to_wav(mp3_path, output_path)
+        finally:
+            if os.path.exists(mp3_path):
+                os.remove(mp3_path)
+
+
+class GTTSProvider(TTSProvider):
+    name = "gtts"
+    honours_voice = False
+
+    def available(self) -> bool:
+        return importlib.util.find_spec("gtts") is not None
+
+    def synthesize(self, text, voice, language, output_path):
+        from gtts import gTTS
+
+        # gTTS has a single voice per language; "en-IN" → lang "en", Indian accent
+        lang, _, region = language.partition("-")
+        tld = "co.in" if region.upper() == "IN" else "com"
+        mp3_path = f"{output_path}.mp3"
+        try:
+            get_policy("gtts", use_breaker=False).call(
+                lambda: gTTS(text=text, lang=lang, tld=tld).save(mp3_path)
+            )
+            _mp3_to_wav(mp3_path, output_path)
+        finally:
+            if os.path.exists(mp3_path):
+                os.remove(mp3_path)
+
+
+class StubProvider(TTSProvider):
+    """
+    Deterministic offline provider: a tone whose pitch and length depend only
+    on (text, voice). Same input, byte-identical WAV, no network.
+    """
+
+    name = "stub"
+    SAMPLE_RATE = 16000
+    SECONDS_PER_CHAR = 0.06
+
+    def synthesize(self, text, voice, language, output_path):
+        seed = hashlib.sha256(f"{voice}\0{text}".encode("utf-8")).digest()
+        frequency = 180 + seed[0] % 120
+        frames = int(self.SAMPLE_RATE * max(0.5, len(text) * self.SECONDS_PER_CHAR))
+
+        with wave.open(output_path, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(self.SAMPLE_RATE)
+            wav.writeframes(b"".join(
+                struct.pack("<h", int(8000 * math.sin(2 * math.pi * frequency * i / self.SAMPLE_RATE)))
+                for i in range(frames)
+            ))
+
+
+PROVIDER_CLASSES = {
+    "sarvam": SarvamProvider,
+    "edge": EdgeProvider,
+    "gtts": GTTSProvider,
+    "stub": StubProvider,
+}
+
+_providers = None
+_providers_lock = threading.Lock()
+
+
+def get_providers() -> list:
+    """Configured providers that are installed, in TTS_PROVIDERS order."""
+    global _providers
+    with _providers_lock:
+        if _providers is None:
+            _providers = []
+            for name in TTS_PROVIDERS:
+                if name not in PROVIDER_CLASSES:
+                    print(f"⚠️ Unknown TTS provider '{name}' ignored")
+                    continue
+                provider = PROVIDER_CLASSES[name]()
+                if provider.available():
+                    _providers.append(provider)
+                else:
+                    print(f"⚠️ TTS provider '{name}' not available (missing package or key)")
+        return _providers
+
+
+def ranked_providers() -> list:
+    """
+    Providers in the order the router will try them: TTS_PROVIDERS order,
+    with (under "adaptive" routing) slow or failing providers moved back,
+    then providers that ignore the speaker, then open breakers (they
+    reject calls until a trial is due). The sort is stable, so preference
+    order holds within each group.
+    """
+    def group(provider):
+        if provider.breaker.is_open:
+            return 3
+        if not provider.honours_voice:
+            return 2
+        if TTS_ROUTING != "ordered" and provider.degraded():
+            return 1
+        return 0
+
+    return sorted(get_providers(), key=group)
+
+
+def _attempt(provider: TTSProvider, text, voice, language, output_path):
+    """One call to one provider, written to output_path; records stats."""
+    if not provider.breaker.allow():
+        raise RuntimeError(f"TTS provider '{provider.name}' circuit is open")
+
+    with provider.slots:
+        # Latency is measured from here, so queueing for a slot is not
+        # held against the provider
+        started = time.monotonic()
+        try:
+            provider.synthesize(text, voice, language, output_path)
+        except Exception as exc:
+            provider.record(time.monotonic() - started, ok=False)
+            provider.breaker.record_failure(exc)
+            raise
+
+        provider.record(time.monotonic() - started, ok=True)
+    provider.breaker.record_success()
+    return provider.name
+
+
+def synthesize(text: str, voice: str, output_path: str, language: str = "en-IN", providers=None,
+               cached=None) -> str:
+    """
+    Speak `text` into output_path (WAV) with the best available provider,
+    failing over to the next one on error. Returns the provider name used.
+    `cached(provider)` is asked right before each provider is tried and
+    returns True if it filled output_path from a cache instead, so another
+    provider's stored audio is only used once the ones before it failed.
+    """
+    providers = providers if providers is not None else ranked_providers()
+    if not providers:
+        raise RuntimeError("No TTS provider available (check TTS_PROVIDERS / SARVAM_API_KEY)")
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    errors = []
+    remaining = list(providers)
+
+    while remaining:
+        provider = remaining.pop(0)
+        if cached is not None and cached(provider):
+            return provider.name
+        try:
+            if TTS_HEDGE_AFTER > 0 and remaining:
+                used = _hedged(provider, remaining.pop(0), text, voice, language, output_path)
+            else:
+                used = _attempt(provider, text, voice, language, output_path)
+            return used
+        except Exception as exc:
+            errors.append(f"{provider.name}: {exc}")
+            print(f"⚠️ TTS via {provider.name} failed → {exc}")
+
+    raise RuntimeError("All TTS providers failed: " + "; ".join(errors))
+
+
+def _hedged(primary, backup, text, voice, language, output_path):
+    """
+    Start `primary`; if it has not finished after TTS_HEDGE_AFTER seconds,
+    start `backup` too. Each writes its own temp file; the first success is
+    moved to output_path. Raises only if both fail.
+    """
+    def run(provider):
+        tmp_path = f"{output_path}.{provider.name}.tmp"
+        _attempt(provider, text, voice, language, tmp_path)
+        return provider, tmp_path
+
+    futures = [_hedge_executor.submit(run, primary)]
+    done, _ = wait(futures, timeout=TTS_HEDGE_AFTER)
+    if not done:
+        print(f"⏱️ TTS via {primary.name} slower than {TTS_HEDGE_AFTER}s, hedging with {backup.name}")
+        futures.append(_hedge_executor.submit(run, backup))
+    elif futures[0].exception() is not None:
+        # Failed fast: plain failover to the backup
+        print(f"⚠️ TTS via {primary.name} failed → {futures[0].exception()}")
+        futures.append(_hedge_executor.submit(run, backup))
+
+    pending = set(futures)
+    last_error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                provider, tmp_path = future.result()
+            except Exception as exc:
+                last_error = exc
+                continue
+            os.replace(tmp_path, output_path)
+            # The loser (if any) finishes in the background; drop its file
+            for other in pending:
+                other.add_done_callback(_discard_result)
+            return provider.name
+
+    raise last_error
+
+
+def _discard_result(future):
+    try:
+        _, tmp_path = future.result()
+    except Exception:
+        return
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
@@ -0,0 +1,45 @@
+# services/tts_stage.py
+#
+# TTS as a stage of the job instead of the request. Jobs created from text
+# (Feature 2, Feature 3 batch children) are queued with input_text / voice
+# and the input_audio path they will use; the worker that claims the job
+# generates the audio here before lipsync starts.
+
+import os
+import threading
+
+from services.tts_client import generate_audio
+
+# TTS calls in flight across all scheduler slots (Sarvam rate limits apply
+# per API key, not per job, so this is independent of lane concurrency)
+TTS_CONCURRENCY = int(os.getenv("TTS_CONCURRENCY", "4"))
+
+_tts_slots = threading.BoundedSemaphore(TTS_CONCURRENCY)
+
+
+def needs_audio(job: dict) -> bool:
+    """True if the job was queued from text and its audio is not on disk yet."""
+    audio_path = job.get("input_audio")
+    return bool(job.get("input_text")) and bool(audio_path) and not os.path.exists(audio_path)
+
+
+def ensure_job_audio(job: dict) -> str:
+    """
+    Generate the job's input_audio from input_text if it is missing.
+    Provider errors fail over to the next TTS provider (see
+    services/tts_providers.py); if all fail, the job fails like any other
+    stage.
+    The WAV is written to a temp name and renamed, so a worker that dies
+    mid-write never leaves a truncated file for the next attempt.
+    """
+    audio_path = job["input_audio"]
+    if not needs_audio(job):
+        return audio_path
+
+    tmp_path = f"{audio_path}.tmp"
+    with _tts_slots:
+        print(f"🗣️ Job {job['job_id']}: generating speech ({job.get('voice')})")
+        generate_audio(text=job["input_text"], voice=job["voice"], output_path=tmp_path)
+    os.replace(tmp_path, audio_path)
+
+    return audio_path
@@ -0,0 +1,104 @@
+# services/upload_ingest.py
+#
+# Streaming ingestion of uploaded files for the create-job endpoints.
+# Uploads are copied in fixed-size chunks straight into the blob store
+# (hashed and size-checked on the fly), so peak memory per upload stays at
+# one chunk no matter how large the file is, and oversized uploads are
+# rejected as soon as they cross the limit.
+#
+# FastAPI parses (and spools to disk) the whole multipart body before the
+# endpoint runs, so UploadLimitMiddleware also rejects requests whose
+# Content-Length is over the endpoint's total limit before any of the body
+# is read.
+
+import os
+
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+
+from services.blob_store import BlobWriter, link_blob
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MB
+
+MB = 1024 * 1024
+MAX_VIDEO_UPLOAD_BYTES = int(os.getenv("MAX_VIDEO_UPLOAD_MB", "500")) * MB
+MAX_AUDIO_UPLOAD_BYTES = int(os.getenv("MAX_AUDIO_UPLOAD_MB", "100")) * MB
+MAX_PPT_UPLOAD_BYTES = int(os.getenv("MAX_PPT_UPLOAD_MB", "100")) * MB
+# Room for multipart headers and the text fields sent with the files
+FORM_OVERHEAD_BYTES = 1 * MB
+
+# Largest request body accepted per upload endpoint (POST)
+UPLOAD_ROUTE_LIMITS = {
+    "/feature1/create-job": MAX_VIDEO_UPLOAD_BYTES + MAX_AUDIO_UPLOAD_BYTES,
+    "/feature2/text-to-avatar": MAX_VIDEO_UPLOAD_BYTES,
+    "/feature3/personalized-wishes": MAX_VIDEO_UPLOAD_BYTES,
+    "/feature4/create-job": MAX_PPT_UPLOAD_BYTES + MAX_VIDEO_UPLOAD_BYTES,
+}
+
+
+def _too_large(upload: UploadFile, max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"{upload.filename or 'Upload'} exceeds the {max_bytes // MB} MB limit"
+    )
+
+
+async def ingest_upload(upload: UploadFile, dest_path: str, max_bytes: int) -> str:
+    """
+    Stream `upload` into the blob store and link it at `dest_path`.
+    Raises HTTPException(413) once more than `max_bytes` were received.
+    Returns the sha256 of the content.
+    """
+    # Reject early when the size is already known from the multipart parser
+    if upload.size is not None and upload.size > max_bytes:
+        raise _too_large(upload, max_bytes)
+
+    writer = await run_in_threadpool(BlobWriter)
+    try:
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            if writer.size + len(chunk) > max_bytes:
+                raise _too_large(upload, max_bytes)
+            await run_in_threadpool(writer.write, chunk)
+    except BaseException:
+        await run_in_threadpool(writer.discard)
+        raise
+
+    digest = await run_in_threadpool(writer.commit)
+    await run_in_threadpool(link_blob, digest, dest_path)
+    return digest
+
+
+class UploadLimitMiddleware:
+    """
+    ASGI middleware: answer 413 from the Content-Length header alone when a
+    request to an upload endpoint is larger than UPLOAD_ROUTE_LIMITS allows
+    (411 if the length is not declared), before the body is parsed.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        limit = None
+        if scope["type"] == "http" and scope["method"] == "POST":
+            limit = UPLOAD_ROUTE_LIMITS.get(scope["path"].rstrip("/"))
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is None or not content_length.isdigit():
+            response = JSONResponse({"detail": "Content-Length required"}, status_code=411)
+        elif int(content_length) > limit + FORM_OVERHEAD_BYTES:
+            response = JSONResponse(
+                {"detail": f"Upload exceeds the {limit // MB} MB limit"}, status_code=413
+            )
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        await response(scope, receive, send)